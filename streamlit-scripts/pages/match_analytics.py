@@ -6,6 +6,7 @@ import time
 from datetime import datetime
 import os
 import sys
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -33,6 +34,29 @@ from services.match_analytics import (
     calculate_user_transitions
 )
 
+# Histogram buckets: tab7 KM counts (0, 1, 2, 3, 4, 5+) and tab8 ghost/pass/no-view counts
+KM_BUCKET_LABELS = ['0', '1', '2', '3', '4', '5+']
+COUNT_BUCKET_EDGES = [2, 4, 6, 11]  # Lower edge of every bucket after the first: 1, 2-3, 4-5, 6-10, 10+
+COUNT_BUCKET_LABELS = ['1', '2-3', '4-5', '6-10', '10+']
+
+# Final decisions a viewer can make on a match (user_matches.is_liked)
+DECISIONS = ['liked', 'disliked', 'passed']
+
+# Chart colours for tab7 decisions and tab8 user categories
+DECISION_COLORS = {
+    'Liked': '#21C354',
+    'Disliked': '#f5576c',
+    'Passed': '#ffa500',
+    'KM, No Decision': '#888888'
+}
+
+USER_CATEGORY_COLORS = {
+    'Active': '#21C354',
+    'Ghost': '#888888',
+    'Pass-Only': '#ffa500',
+    'No Views': '#f5576c'
+}
+
 # --- Page Title ---
 st.title("Match Analytics")
 
@@ -271,6 +295,112 @@ def format_date_display(date_str: str) -> str:
         return date_str
 
 
+def bin_counts(values, edges: list) -> np.ndarray:
+    """Count integer values into len(edges) + 1 buckets split at the given lower edges."""
+    return np.bincount(np.digitize(values, edges), minlength=len(edges) + 1)
+
+
+@st.cache_data(show_spinner=False, ttl=300, max_entries=32)
+def build_matches_df(filter_key: tuple, _matches: list) -> pd.DataFrame:
+    """Convert filtered match records to a columnar DataFrame once per filter selection."""
+    df = pd.DataFrame(_matches)
+    if 'is_liked' in df:
+        # 1-byte codes instead of Python strings; anything outside the three decisions becomes NaN
+        df['is_liked'] = pd.Categorical(df['is_liked'], categories=DECISIONS)
+    return df
+
+
+@st.cache_data(show_spinner=False, ttl=300, max_entries=32)
+def build_user_behavior(filter_key: tuple, _df_matches: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate matches into one row per current_user_id with view/decision counts and a behavior category."""
+    viewed = _df_matches['is_viewed'].eq(True)
+    df_behavior = _df_matches[['current_user_id']].assign(
+        viewed=viewed,
+        liked=viewed & (_df_matches['is_liked'] == 'liked'),
+        disliked=viewed & (_df_matches['is_liked'] == 'disliked'),
+        passed=viewed & (_df_matches['is_liked'] == 'passed')
+    )
+
+    user_behavior = df_behavior.groupby('current_user_id', sort=False, dropna=False).agg(
+        viewed=('viewed', 'sum'),
+        liked=('liked', 'sum'),
+        disliked=('disliked', 'sum'),
+        passed=('passed', 'sum'),
+        total_matches=('viewed', 'size')
+    ).rename_axis('user_id').reset_index()
+
+    # Categorize users (first matching condition wins; viewed-but-undecided users are Ghost)
+    user_behavior['category'] = pd.Categorical(
+        np.select(
+            [
+                user_behavior['viewed'] == 0,                                # Never viewed any match
+                (user_behavior['liked'] + user_behavior['disliked']) > 0,    # At least one like or dislike
+                user_behavior['passed'] > 0                                  # Only passed, never liked or disliked
+            ],
+            ['No Views', 'Active', 'Pass-Only'],
+            default='Ghost'
+        ),
+        categories=list(USER_CATEGORY_COLORS)
+    )
+    return user_behavior
+
+
+# --- Cached Plotly figures (keyed on the aggregated values, so unrelated reruns reuse them) ---
+@st.cache_resource(show_spinner=False, max_entries=100)
+def build_decision_bar(decisions: tuple, y_col: str, values: tuple, text: tuple, title: str) -> go.Figure:
+    """Bar chart with one bar per decision, coloured by DECISION_COLORS."""
+    fig = px.bar(
+        pd.DataFrame({'Decision': decisions, y_col: values}),
+        x='Decision',
+        y=y_col,
+        text=list(text),
+        color='Decision',
+        color_discrete_map=DECISION_COLORS
+    )
+    fig.update_layout(
+        title=title,
+        height=300,
+        showlegend=False
+    )
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=100)
+def build_category_pie(categories: tuple, counts: tuple) -> go.Figure:
+    """Donut chart of users per behaviour category."""
+    fig = px.pie(
+        pd.DataFrame({'Category': categories, 'Count': counts}),
+        values='Count',
+        names='Category',
+        color='Category',
+        color_discrete_map=USER_CATEGORY_COLORS,
+        hole=0.4
+    )
+    fig.update_layout(
+        title='User Category Distribution',
+        height=350
+    )
+    fig.update_traces(textposition='outside', textinfo='label+percent')
+    return fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=100)
+def build_engagement_funnel(stages: tuple, counts: tuple) -> go.Figure:
+    """Funnel chart from total users down to users who liked/disliked."""
+    fig = px.funnel(
+        pd.DataFrame({'Stage': stages, 'Count': counts}),
+        x='Count',
+        y='Stage',
+        color_discrete_sequence=['#667eea']
+    )
+    fig.update_layout(
+        title='Engagement Funnel',
+        height=350
+    )
+    return fig
+
+
 def run_refresh():
     """Execute the full refresh process with progress tracking."""
     st.session_state.refresh_in_progress = True
@@ -498,6 +628,10 @@ filtered_matches = filter_data(
     tier=st.session_state.tier_filter
 )
 
+# Shared columnar view of filtered_matches; filter_key also keys the per-tab aggregation caches
+filter_key = (tuple(st.session_state.selected_dates), st.session_state.gender_filter, st.session_state.tier_filter, last_refresh)
+df_matches = build_matches_df(filter_key, filtered_matches)
+
 # --- Summary Stats ---
 total_matches = len(filtered_matches)
 unique_users = len(set(m.get('current_user_id') for m in filtered_matches))
@@ -1906,44 +2040,53 @@ with tab6:
 # ============================================
 # TAB 7: KM - Know More Distribution
 # ============================================
-with tab7:
+@st.fragment
+def render_km_tab(df_matches: pd.DataFrame):
+    """Render tab 7: Know More click distribution, overall and by decision."""
     st.markdown("### Know More Distribution")
     st.markdown("*How many times do users click 'Know More' on profiles?*")
 
-    if not filtered_matches:
+    if df_matches.empty:
         st.warning("No data available for selected filters.")
     else:
         # Only consider viewed matches for KM analysis
-        viewed_matches = [m for m in filtered_matches if m.get('is_viewed')]
+        df_viewed = df_matches.loc[df_matches['is_viewed'].eq(True), ['know_more_count', 'is_liked']]
 
-        if not viewed_matches:
+        if df_viewed.empty:
             st.warning("No viewed matches found for selected filters.")
         else:
-            # Get KM counts
-            km_counts = {}  # km_value -> count of matches
-            km_by_decision = {'liked': [], 'disliked': [], 'passed': [], 'km_no_decision': []}
-
-            for m in viewed_matches:
-                km = m.get('know_more_count') or 0
-                km_counts[km] = km_counts.get(km, 0) + 1
-
-                decision = m.get('is_liked')
-                if decision == 'liked':
-                    km_by_decision['liked'].append(km)
-                elif decision == 'disliked':
-                    km_by_decision['disliked'].append(km)
-                elif decision == 'passed':
-                    km_by_decision['passed'].append(km)
-                elif km > 0:
-                    # Clicked KM but no final decision (is_liked is null/empty/other)
-                    km_by_decision['km_no_decision'].append(km)
+            # KM values and their zero mask for the per-decision stats
+            km = df_viewed['know_more_count'].fillna(0).astype('int32')
+            df_viewed = df_viewed.assign(km=km, zero=km == 0)
+            km_arr = df_viewed['km'].to_numpy()
+
+            # One full histogram of KM values (index = KM count) feeds the summary stats,
+            # the bucketed distribution chart and the detailed breakdown
+            km_hist = np.bincount(km_arr, minlength=len(KM_BUCKET_LABELS))
+            km_counts = pd.Series(km_hist)[km_hist > 0]  # km_value -> count of matches
+
+            # Categories to display in the table (always show all 4, even if 0)
+            display_decisions = DECISIONS + ['km_no_decision']
+
+            # Clicked KM but no final decision (is_liked is null/empty/other) goes to 'km_no_decision'
+            decided = df_viewed['is_liked'].notna()
+            df_decision_km = df_viewed.loc[decided | (df_viewed['km'] > 0), ['is_liked', 'km', 'zero']]
+            decision_key = df_decision_km['is_liked'].cat.add_categories('km_no_decision').where(decided, 'km_no_decision')
+
+            # One indexed reduction gives every per-decision number used below (table, charts, insights)
+            km_decision_stats = df_decision_km.groupby(decision_key, observed=True).agg(
+                count=('km', 'size'),
+                avg=('km', 'mean'),
+                max=('km', 'max'),
+                zeros=('zero', 'sum')
+            ).reindex(display_decisions, fill_value=0)
+            km_decision_stats['zero_pct'] = km_decision_stats['zeros'] / km_decision_stats['count'] * 100
 
             # Summary stats
-            all_km = [m.get('know_more_count') or 0 for m in viewed_matches]
-            avg_km = sum(all_km) / len(all_km) if all_km else 0
-            max_km = max(all_km) if all_km else 0
-            zero_km = sum(1 for km in all_km if km == 0)
-            zero_pct = (zero_km / len(all_km) * 100) if all_km else 0
+            avg_km = (km_hist * np.arange(len(km_hist))).sum() / len(km_arr)
+            max_km = int(km_counts.index[-1])
+            zero_km = int(km_hist[0])
+            zero_pct = zero_km / len(km_arr) * 100
 
             col1, col2, col3, col4 = st.columns(4)
             with col1:
@@ -1953,7 +2096,7 @@ with tab7:
             with col3:
                 st.metric("Zero KM %", f"{zero_pct:.1f}%")
             with col4:
-                st.metric("Total Viewed", len(viewed_matches))
+                st.metric("Total Viewed", len(df_viewed))
 
             st.markdown("---")
 
@@ -1961,146 +2104,68 @@ with tab7:
             st.markdown("#### KM Count Distribution")
 
             # Prepare data for chart (0, 1, 2, 3, 4, 5+)
-            km_buckets = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, '5+': 0}
-            for km, count in km_counts.items():
-                if km >= 5:
-                    km_buckets['5+'] += count
-                else:
-                    km_buckets[km] = km_buckets.get(km, 0) + count
-
-            total = sum(km_buckets.values())
-            df_km = pd.DataFrame([
-                {
-                    'KM Count': str(k),
-                    'Matches': v,
-                    'Percentage': (v / total * 100) if total > 0 else 0
-                }
-                for k, v in km_buckets.items()
-            ])
+            km_bucket_counts = np.append(km_hist[:5], km_hist[5:].sum())
+            df_km = pd.DataFrame({
+                'KM Count': pd.Series(KM_BUCKET_LABELS, dtype='string'),
+                'Matches': km_bucket_counts.astype(np.int32)
+            })
 
-            fig_km = px.bar(
-                df_km,
-                x='KM Count',
-                y='Matches',
-                text=df_km.apply(lambda row: f"{row['Matches']} ({row['Percentage']:.1f}%)", axis=1),
-                color_discrete_sequence=['#667eea']
+            st.bar_chart(
+                df_km, x='KM Count', y='Matches',
+                x_label='Know More Count', y_label='Number of Matches',
+                color='#667eea', sort=False, height=350
             )
-            fig_km.update_layout(
-                title='Know More Click Distribution',
-                height=350,
-                xaxis_title='Know More Count',
-                yaxis_title='Number of Matches'
-            )
-            fig_km.update_traces(textposition='outside')
-            st.plotly_chart(fig_km, use_container_width=True)
 
             st.markdown("---")
 
             # KM by decision type
             st.markdown("#### KM Count by Decision")
 
-            decision_stats = []
-            # Categories to display in the table (always show all 4, even if 0)
-            display_decisions = ['liked', 'disliked', 'passed', 'km_no_decision']
-            for decision in display_decisions:
-                km_list = km_by_decision.get(decision, [])
-                display_name = 'Clicked KM, No Decision' if decision == 'km_no_decision' else decision.replace('_', ' ').title()
-                if km_list:
-                    avg = sum(km_list) / len(km_list)
-                    zero_pct = sum(1 for km in km_list if km == 0) / len(km_list) * 100
-                    decision_stats.append({
-                        'Decision': display_name,
-                        'Count': len(km_list),
-                        'Avg KM': f"{avg:.2f}",
-                        'Zero KM %': f"{zero_pct:.1f}%",
-                        'Max KM': max(km_list)
-                    })
-                else:
-                    # Show 0 if no data for this category
-                    decision_stats.append({
-                        'Decision': display_name,
-                        'Count': 0,
-                        'Avg KM': "0.00",
-                        'Zero KM %': "-",
-                        'Max KM': 0
-                    })
+            # Numeric columns stay numeric; display formatting is applied by column_config.
+            # Decisions with no data show 0 counts and a blank Zero KM %.
+            df_decision = pd.DataFrame({
+                'Decision': pd.Series(
+                    ['Clicked KM, No Decision' if d == 'km_no_decision' else d.title() for d in display_decisions],
+                    dtype='string'
+                ),
+                'Count': km_decision_stats['count'].to_numpy(dtype=np.int32),
+                'Avg KM': km_decision_stats['avg'].to_numpy(dtype=np.float64),
+                'Zero KM %': km_decision_stats['zero_pct'].to_numpy(dtype=np.float64),
+                'Max KM': km_decision_stats['max'].to_numpy(dtype=np.int32)
+            })
+            st.dataframe(
+                df_decision,
+                column_config={
+                    'Avg KM': st.column_config.NumberColumn('Avg KM', format='%.2f'),
+                    'Zero KM %': st.column_config.NumberColumn('Zero KM %', format='%.1f%%'),
+                },
+                use_container_width=True,
+                hide_index=True
+            )
 
-            if decision_stats:
-                df_decision = pd.DataFrame(decision_stats)
-                st.dataframe(df_decision, use_container_width=True, hide_index=True)
+            # Chart rows: only decisions that have data, with the shorter no-decision label
+            df_decision_chart = df_decision[df_decision['Count'] > 0]
+            chart_names = tuple(df_decision_chart['Decision'].replace('Clicked KM, No Decision', 'KM, No Decision'))
 
             # Comparison chart
             col1, col2 = st.columns(2)
 
             with col1:
                 # Average KM by decision
-                avg_data = []
-                for decision in display_decisions:
-                    km_list = km_by_decision.get(decision, [])
-                    if km_list:
-                        display_name = 'KM, No Decision' if decision == 'km_no_decision' else decision.replace('_', ' ').title()
-                        avg_data.append({
-                            'Decision': display_name,
-                            'Avg KM': sum(km_list) / len(km_list)
-                        })
-
-                if avg_data:
-                    df_avg = pd.DataFrame(avg_data)
-                    fig_avg = px.bar(
-                        df_avg,
-                        x='Decision',
-                        y='Avg KM',
-                        text=df_avg['Avg KM'].apply(lambda x: f"{x:.2f}"),
-                        color='Decision',
-                        color_discrete_map={
-                            'Liked': '#21C354',
-                            'Disliked': '#f5576c',
-                            'Passed': '#ffa500',
-                            'KM, No Decision': '#888888'
-                        }
-                    )
-                    fig_avg.update_layout(
-                        title='Avg KM by Decision',
-                        height=300,
-                        showlegend=False
+                if not df_decision_chart.empty:
+                    fig_avg = build_decision_bar(
+                        decisions=chart_names, y_col='Avg KM', values=tuple(df_decision_chart['Avg KM'].tolist()),
+                        text=tuple(df_decision_chart['Avg KM'].map('{:.2f}'.format)), title='Avg KM by Decision'
                     )
-                    fig_avg.update_traces(textposition='outside')
                     st.plotly_chart(fig_avg, use_container_width=True)
 
             with col2:
                 # Zero KM percentage by decision
-                zero_data = []
-                for decision in display_decisions:
-                    km_list = km_by_decision.get(decision, [])
-                    if km_list:
-                        zero_pct = sum(1 for km in km_list if km == 0) / len(km_list) * 100
-                        display_name = 'KM, No Decision' if decision == 'km_no_decision' else decision.replace('_', ' ').title()
-                        zero_data.append({
-                            'Decision': display_name,
-                            'Zero KM %': zero_pct
-                        })
-
-                if zero_data:
-                    df_zero = pd.DataFrame(zero_data)
-                    fig_zero = px.bar(
-                        df_zero,
-                        x='Decision',
-                        y='Zero KM %',
-                        text=df_zero['Zero KM %'].apply(lambda x: f"{x:.1f}%"),
-                        color='Decision',
-                        color_discrete_map={
-                            'Liked': '#21C354',
-                            'Disliked': '#f5576c',
-                            'Passed': '#ffa500',
-                            'KM, No Decision': '#888888'
-                        }
-                    )
-                    fig_zero.update_layout(
-                        title='Zero KM % by Decision',
-                        height=300,
-                        showlegend=False
+                if not df_decision_chart.empty:
+                    fig_zero = build_decision_bar(
+                        decisions=chart_names, y_col='Zero KM %', values=tuple(df_decision_chart['Zero KM %'].tolist()),
+                        text=tuple(df_decision_chart['Zero KM %'].map('{:.1f}%'.format)), title='Zero KM % by Decision'
                     )
-                    fig_zero.update_traces(textposition='outside')
                     st.plotly_chart(fig_zero, use_container_width=True)
 
             st.markdown("---")
@@ -2109,8 +2174,8 @@ with tab7:
             st.markdown("#### Insights")
 
             # Calculate insights
-            liked_avg = sum(km_by_decision['liked']) / len(km_by_decision['liked']) if km_by_decision['liked'] else 0
-            disliked_avg = sum(km_by_decision['disliked']) / len(km_by_decision['disliked']) if km_by_decision['disliked'] else 0
+            liked_avg = km_decision_stats.loc['liked', 'avg']
+            disliked_avg = km_decision_stats.loc['disliked', 'avg']
 
             col1, col2 = st.columns(2)
             with col1:
@@ -2130,23 +2195,24 @@ with tab7:
 
             # Detailed breakdown table
             with st.expander("Detailed KM Breakdown"):
-                detailed_data = []
-                for km_val in sorted(km_counts.keys()):
-                    count = km_counts[km_val]
-                    pct = (count / len(viewed_matches) * 100) if viewed_matches else 0
-                    detailed_data.append({
-                        'KM Count': km_val,
-                        'Matches': count,
-                        'Percentage': f"{pct:.2f}%"
-                    })
-                df_detailed = pd.DataFrame(detailed_data)
+                df_detailed = pd.DataFrame({
+                    'KM Count': km_counts.index.to_numpy(),
+                    'Matches': km_counts.to_numpy(),
+                    'Percentage': (km_counts / len(km_arr) * 100).map('{:.2f}%'.format).to_numpy()
+                })
                 st.dataframe(df_detailed, use_container_width=True, hide_index=True)
 
 
+with tab7:
+    render_km_tab(df_matches)
+
+
 # ============================================
 # TAB 8: GHOST - Ghost & Pass-Only Users
 # ============================================
-with tab8:
+@st.fragment
+def render_ghost_tab(filter_key: tuple, df_matches: pd.DataFrame):
+    """Render tab 8: ghost, pass-only and no-view user breakdown."""
     st.markdown("### Ghost & Pass-Only Users")
 
     # Clear definitions at the top
@@ -2161,61 +2227,19 @@ with tab8:
 
     st.markdown("---")
 
-    if not filtered_matches:
+    if df_matches.empty:
         st.warning("No data available for selected filters.")
     else:
-        # Group matches by current_user_id to analyze user behavior
-        user_behavior = {}  # user_id -> {'viewed': 0, 'liked': 0, 'disliked': 0, 'passed': 0, 'no_decision': 0}
+        # Per-user view/decision counts (cached per filter selection)
+        user_behavior = build_user_behavior(filter_key, df_matches)
 
-        for m in filtered_matches:
-            user_id = m.get('current_user_id')
-            if user_id not in user_behavior:
-                user_behavior[user_id] = {
-                    'viewed': 0,
-                    'liked': 0,
-                    'disliked': 0,
-                    'passed': 0,
-                    'no_decision': 0,
-                    'total_matches': 0
-                }
-
-            user_behavior[user_id]['total_matches'] += 1
-
-            if m.get('is_viewed'):
-                user_behavior[user_id]['viewed'] += 1
-
-                decision = m.get('is_liked')
-                if decision == 'liked':
-                    user_behavior[user_id]['liked'] += 1
-                elif decision == 'disliked':
-                    user_behavior[user_id]['disliked'] += 1
-                elif decision == 'passed':
-                    user_behavior[user_id]['passed'] += 1
-                else:
-                    user_behavior[user_id]['no_decision'] += 1
-
-        # Categorize users
-        ghost_users = []  # Viewed but no likes/dislikes (only passes or no decision)
-        pass_only_users = []  # Only passed, never liked or disliked
-        no_view_users = []  # Never viewed any match
-        active_users = []  # At least one like or dislike
-        super_active = []  # High engagement
-
-        for user_id, stats in user_behavior.items():
-            total_decisions = stats['liked'] + stats['disliked'] + stats['passed']
-
-            if stats['viewed'] == 0:
-                no_view_users.append({'user_id': user_id, **stats})
-            elif stats['liked'] == 0 and stats['disliked'] == 0:
-                if stats['passed'] > 0:
-                    pass_only_users.append({'user_id': user_id, **stats})
-                else:
-                    ghost_users.append({'user_id': user_id, **stats})
-            else:
-                active_users.append({'user_id': user_id, **stats})
-                if stats['liked'] + stats['disliked'] >= 5:
-                    super_active.append({'user_id': user_id, **stats})
+        ghost_df = user_behavior[user_behavior['category'] == 'Ghost']
+        pass_only_df = user_behavior[user_behavior['category'] == 'Pass-Only']
+        no_view_df = user_behavior[user_behavior['category'] == 'No Views']
 
+        # Users per category (Active, Ghost, Pass-Only, No Views) drive the metrics, pie and funnel
+        category_counts = user_behavior['category'].value_counts().reindex(list(USER_CATEGORY_COLORS), fill_value=0)
+        n_active, n_ghost, n_pass_only, n_no_view = (int(c) for c in category_counts)
         total_users = len(user_behavior)
 
         # Summary metrics
@@ -2225,17 +2249,17 @@ with tab8:
         with col1:
             st.metric("Total Users", total_users)
         with col2:
-            ghost_pct = (len(ghost_users) / total_users * 100) if total_users > 0 else 0
-            st.metric("Ghost Users", f"{len(ghost_users)} ({ghost_pct:.1f}%)")
+            ghost_pct = (n_ghost / total_users * 100) if total_users > 0 else 0
+            st.metric("Ghost Users", f"{n_ghost} ({ghost_pct:.1f}%)")
         with col3:
-            pass_pct = (len(pass_only_users) / total_users * 100) if total_users > 0 else 0
-            st.metric("Pass-Only", f"{len(pass_only_users)} ({pass_pct:.1f}%)")
+            pass_pct = (n_pass_only / total_users * 100) if total_users > 0 else 0
+            st.metric("Pass-Only", f"{n_pass_only} ({pass_pct:.1f}%)")
         with col4:
-            noview_pct = (len(no_view_users) / total_users * 100) if total_users > 0 else 0
-            st.metric("No Views", f"{len(no_view_users)} ({noview_pct:.1f}%)")
+            noview_pct = (n_no_view / total_users * 100) if total_users > 0 else 0
+            st.metric("No Views", f"{n_no_view} ({noview_pct:.1f}%)")
         with col5:
-            active_pct = (len(active_users) / total_users * 100) if total_users > 0 else 0
-            st.metric("Active Users", f"{len(active_users)} ({active_pct:.1f}%)")
+            active_pct = (n_active / total_users * 100) if total_users > 0 else 0
+            st.metric("Active Users", f"{n_active} ({active_pct:.1f}%)")
 
 
         st.markdown("---")
@@ -2246,53 +2270,27 @@ with tab8:
         col1, col2 = st.columns(2)
 
         with col1:
-            pie_data = pd.DataFrame([
-                {'Category': 'Active', 'Count': len(active_users)},
-                {'Category': 'Ghost', 'Count': len(ghost_users)},
-                {'Category': 'Pass-Only', 'Count': len(pass_only_users)},
-                {'Category': 'No Views', 'Count': len(no_view_users)}
-            ])
+            pie_data = pd.DataFrame({
+                'Category': pd.Series(category_counts.index, dtype='string'),
+                'Count': category_counts.to_numpy(dtype=np.int32)
+            })
 
-            fig_pie = px.pie(
-                pie_data,
-                values='Count',
-                names='Category',
-                color='Category',
-                color_discrete_map={
-                    'Active': '#21C354',
-                    'Ghost': '#888888',
-                    'Pass-Only': '#ffa500',
-                    'No Views': '#f5576c'
-                },
-                hole=0.4
-            )
-            fig_pie.update_layout(
-                title='User Category Distribution',
-                height=350
-            )
-            fig_pie.update_traces(textposition='outside', textinfo='label+percent')
+            fig_pie = build_category_pie(tuple(pie_data['Category']), tuple(pie_data['Count'].tolist()))
             st.plotly_chart(fig_pie, use_container_width=True)
 
         with col2:
             # Engagement funnel
-            funnel_data = [
-                {'Stage': 'Total Users', 'Count': total_users},
-                {'Stage': 'Viewed At Least 1', 'Count': total_users - len(no_view_users)},
-                {'Stage': 'Made Any Decision', 'Count': len(active_users) + len(pass_only_users)},
-                {'Stage': 'Liked/Disliked', 'Count': len(active_users)}
-            ]
-            df_funnel = pd.DataFrame(funnel_data)
-
-            fig_funnel = px.funnel(
-                df_funnel,
-                x='Count',
-                y='Stage',
-                color_discrete_sequence=['#667eea']
-            )
-            fig_funnel.update_layout(
-                title='Engagement Funnel',
-                height=350
-            )
+            df_funnel = pd.DataFrame({
+                'Stage': pd.Series(['Total Users', 'Viewed At Least 1', 'Made Any Decision', 'Liked/Disliked'], dtype='string'),
+                'Count': np.array([
+                    total_users,
+                    total_users - n_no_view,
+                    n_active + n_pass_only,
+                    n_active
+                ], dtype=np.int32)
+            })
+
+            fig_funnel = build_engagement_funnel(tuple(df_funnel['Stage']), tuple(df_funnel['Count'].tolist()))
             st.plotly_chart(fig_funnel, use_container_width=True)
 
         st.markdown("---")
@@ -2300,57 +2298,29 @@ with tab8:
         # Ghost Users Analysis
         st.markdown("#### Ghost Users Details")
 
-        if ghost_users:
-            # Sort by viewed count descending
-            ghost_users_sorted = sorted(ghost_users, key=lambda x: x['viewed'], reverse=True)
-
+        if not ghost_df.empty:
             col1, col2 = st.columns(2)
             with col1:
-                avg_viewed_ghost = sum(g['viewed'] for g in ghost_users) / len(ghost_users)
+                avg_viewed_ghost = ghost_df['viewed'].mean()
                 st.metric("Avg Views per Ghost", f"{avg_viewed_ghost:.1f}")
             with col2:
-                max_viewed_ghost = max(g['viewed'] for g in ghost_users)
+                max_viewed_ghost = int(ghost_df['viewed'].max())
                 st.metric("Max Views (Ghost)", max_viewed_ghost)
 
             # View distribution for ghosts
-            ghost_view_buckets = {'1': 0, '2-3': 0, '4-5': 0, '6-10': 0, '10+': 0}
-            for g in ghost_users:
-                v = g['viewed']
-                if v == 1:
-                    ghost_view_buckets['1'] += 1
-                elif v <= 3:
-                    ghost_view_buckets['2-3'] += 1
-                elif v <= 5:
-                    ghost_view_buckets['4-5'] += 1
-                elif v <= 10:
-                    ghost_view_buckets['6-10'] += 1
-                else:
-                    ghost_view_buckets['10+'] += 1
+            ghost_view_buckets = bin_counts(ghost_df['viewed'], COUNT_BUCKET_EDGES)
 
-            df_ghost_dist = pd.DataFrame([
-                {'Views': k, 'Users': v}
-                for k, v in ghost_view_buckets.items()
-            ])
+            df_ghost_dist = pd.DataFrame({'Views': pd.Series(COUNT_BUCKET_LABELS, dtype='string'), 'Users': ghost_view_buckets.astype(np.int32)})
 
-            fig_ghost = px.bar(
-                df_ghost_dist,
-                x='Views',
-                y='Users',
-                text='Users',
-                color_discrete_sequence=['#888888']
+            st.bar_chart(
+                df_ghost_dist, x='Views', y='Users',
+                x_label='Number of Views', y_label='Users',
+                color='#888888', sort=False, height=300
             )
-            fig_ghost.update_layout(
-                title='Ghost Users by View Count',
-                height=300,
-                xaxis_title='Number of Views',
-                yaxis_title='Users'
-            )
-            fig_ghost.update_traces(textposition='outside')
-            st.plotly_chart(fig_ghost, use_container_width=True)
 
             with st.expander("Ghost Users List (Top 20)"):
-                df_ghost = pd.DataFrame(ghost_users_sorted[:20])
-                df_ghost = df_ghost[['user_id', 'viewed', 'total_matches']]
+                # Top 20 by viewed count (partial selection, no full sort)
+                df_ghost = ghost_df.nlargest(20, 'viewed')[['user_id', 'viewed', 'total_matches']]
                 df_ghost.columns = ['User ID', 'Viewed', 'Total Matches']
                 st.dataframe(df_ghost, use_container_width=True, hide_index=True)
         else:
@@ -2361,56 +2331,28 @@ with tab8:
         # Pass-Only Users Analysis
         st.markdown("#### Pass-Only Users Details")
 
-        if pass_only_users:
-            pass_users_sorted = sorted(pass_only_users, key=lambda x: x['passed'], reverse=True)
-
+        if not pass_only_df.empty:
             col1, col2 = st.columns(2)
             with col1:
-                avg_passed = sum(p['passed'] for p in pass_only_users) / len(pass_only_users)
+                avg_passed = pass_only_df['passed'].mean()
                 st.metric("Avg Passes per User", f"{avg_passed:.1f}")
             with col2:
-                max_passed = max(p['passed'] for p in pass_only_users)
+                max_passed = int(pass_only_df['passed'].max())
                 st.metric("Max Passes", max_passed)
 
             # Pass distribution
-            pass_buckets = {'1': 0, '2-3': 0, '4-5': 0, '6-10': 0, '10+': 0}
-            for p in pass_only_users:
-                v = p['passed']
-                if v == 1:
-                    pass_buckets['1'] += 1
-                elif v <= 3:
-                    pass_buckets['2-3'] += 1
-                elif v <= 5:
-                    pass_buckets['4-5'] += 1
-                elif v <= 10:
-                    pass_buckets['6-10'] += 1
-                else:
-                    pass_buckets['10+'] += 1
+            pass_buckets = bin_counts(pass_only_df['passed'], COUNT_BUCKET_EDGES)
 
-            df_pass_dist = pd.DataFrame([
-                {'Passes': k, 'Users': v}
-                for k, v in pass_buckets.items()
-            ])
+            df_pass_dist = pd.DataFrame({'Passes': pd.Series(COUNT_BUCKET_LABELS, dtype='string'), 'Users': pass_buckets.astype(np.int32)})
 
-            fig_pass = px.bar(
-                df_pass_dist,
-                x='Passes',
-                y='Users',
-                text='Users',
-                color_discrete_sequence=['#ffa500']
-            )
-            fig_pass.update_layout(
-                title='Pass-Only Users by Pass Count',
-                height=300,
-                xaxis_title='Number of Passes',
-                yaxis_title='Users'
+            st.bar_chart(
+                df_pass_dist, x='Passes', y='Users',
+                x_label='Number of Passes', y_label='Users',
+                color='#ffa500', sort=False, height=300
             )
-            fig_pass.update_traces(textposition='outside')
-            st.plotly_chart(fig_pass, use_container_width=True)
 
             with st.expander("Pass-Only Users List (Top 20)"):
-                df_pass = pd.DataFrame(pass_users_sorted[:20])
-                df_pass = df_pass[['user_id', 'viewed', 'passed', 'total_matches']]
+                df_pass = pass_only_df.nlargest(20, 'passed')[['user_id', 'viewed', 'passed', 'total_matches']]
                 df_pass.columns = ['User ID', 'Viewed', 'Passed', 'Total Matches']
                 st.dataframe(df_pass, use_container_width=True, hide_index=True)
         else:
@@ -2421,56 +2363,28 @@ with tab8:
         # No Views Users Analysis
         st.markdown("#### No Views Users Details")
 
-        if no_view_users:
-            no_view_sorted = sorted(no_view_users, key=lambda x: x['total_matches'], reverse=True)
-
+        if not no_view_df.empty:
             col1, col2 = st.columns(2)
             with col1:
-                avg_matches = sum(u['total_matches'] for u in no_view_users) / len(no_view_users)
+                avg_matches = no_view_df['total_matches'].mean()
                 st.metric("Avg Matches per User", f"{avg_matches:.1f}")
             with col2:
-                max_matches = max(u['total_matches'] for u in no_view_users)
+                max_matches = int(no_view_df['total_matches'].max())
                 st.metric("Max Matches Assigned", max_matches)
 
             # Matches distribution for no-view users
-            noview_buckets = {'1': 0, '2-3': 0, '4-5': 0, '6-10': 0, '10+': 0}
-            for u in no_view_users:
-                m = u['total_matches']
-                if m == 1:
-                    noview_buckets['1'] += 1
-                elif m <= 3:
-                    noview_buckets['2-3'] += 1
-                elif m <= 5:
-                    noview_buckets['4-5'] += 1
-                elif m <= 10:
-                    noview_buckets['6-10'] += 1
-                else:
-                    noview_buckets['10+'] += 1
+            noview_buckets = bin_counts(no_view_df['total_matches'], COUNT_BUCKET_EDGES)
 
-            df_noview_dist = pd.DataFrame([
-                {'Matches': k, 'Users': v}
-                for k, v in noview_buckets.items()
-            ])
+            df_noview_dist = pd.DataFrame({'Matches': pd.Series(COUNT_BUCKET_LABELS, dtype='string'), 'Users': noview_buckets.astype(np.int32)})
 
-            fig_noview = px.bar(
-                df_noview_dist,
-                x='Matches',
-                y='Users',
-                text='Users',
-                color_discrete_sequence=['#f5576c']
-            )
-            fig_noview.update_layout(
-                title='No-View Users by Matches Assigned',
-                height=300,
-                xaxis_title='Matches Assigned',
-                yaxis_title='Users'
+            st.bar_chart(
+                df_noview_dist, x='Matches', y='Users',
+                x_label='Matches Assigned', y_label='Users',
+                color='#f5576c', sort=False, height=300
             )
-            fig_noview.update_traces(textposition='outside')
-            st.plotly_chart(fig_noview, use_container_width=True)
 
             with st.expander("No Views Users List (Top 20)"):
-                df_noview = pd.DataFrame(no_view_sorted[:20])
-                df_noview = df_noview[['user_id', 'total_matches']]
+                df_noview = no_view_df.nlargest(20, 'total_matches')[['user_id', 'total_matches']]
                 df_noview.columns = ['User ID', 'Total Matches']
                 st.dataframe(df_noview, use_container_width=True, hide_index=True)
         else:
@@ -2499,6 +2413,10 @@ with tab8:
                 st.success(f"**Low ghost rate ({ghost_pct:.1f}%).** Users are making decisions after viewing.")
 
 
+with tab8:
+    render_ghost_tab(filter_key, df_matches)
+
+
 # ============================================
 # TAB 9: RETENTION - User Retention Analytics
 # ============================================
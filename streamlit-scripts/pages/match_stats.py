@@ -4,10 +4,23 @@ View overview metrics, search user match history, and analyze trends.
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
+import functools
+import hashlib
+import html
+import importlib.util
+import inspect
 import os
+import shutil
 import sys
+import textwrap
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
+import httpx
 
 # Setup paths
 current_dir = os.path.dirname(__file__)
@@ -22,45 +35,254 @@ except ImportError:
     st.error("Error: 'dependencies.py' not found.")
     st.stop()
 
+from services.postgrest_csv import read_postgrest_csv
+
 # Load environment
 dotenv_path = os.path.join(parent_dir, '.env')
 load_dotenv(dotenv_path)
 
+# Disk snapshots of the full user_matches fetches, reused across app restarts
+DISK_CACHE_DIR = os.path.join(scripts_dir, 'data', 'match_stats_cache')
+DISK_CACHE_TTL = 300  # seconds, same as the in-memory cache ttl
+# Per-user rows kept between lookups so overlapping id sets only fetch the new ids
+USER_ROW_TTL = 300  # seconds, same as the in-memory cache ttl
+USER_ROW_MAX_ENTRIES = 50000  # per table/columns store
+LIKES_TOP_N = 50  # users listed in the Male/Female Likes tabs
+LIKES_PAGE_SIZE = 10
+MUTUAL_PAGE_SIZE = 50  # mutual pairs added per "Load more"
+# (table, columns) each per-user batch lookup reads
+USER_GENDER_ROWS = ('user_metadata', 'user_id, gender')
+USER_CONTACT_ROWS = ('user_data', 'user_id, user_email, user_phone')
+USER_PROFILE_ROWS = ('user_metadata', 'user_id, name, age, city, phone_num, profile_images, instagram_images, dob')
+# Column dtypes for CSV pages, so every page parses the same way whatever its values
+CSV_DTYPES = {
+    'match_id': 'str', 'current_user_id': 'str', 'matched_user_id': 'str', 'is_liked': 'str',
+    'origin_phase': 'str', 'run_id': 'str', 'created_at': 'str',
+    'is_viewed': 'boolean', 'is_mutual': 'boolean', 'mutual_score': 'float64', 'know_more_count': 'float64',
+}
+
+# CSS for the Funnel tab's boxes; colors come from --funnel-* variables set on each box
+FUNNEL_CSS = """
+<style>
+.funnel-box {
+    background: linear-gradient(135deg, var(--funnel-tint), var(--funnel-tint-light));
+    border-left: 4px solid var(--funnel-color);
+    border-radius: 8px;
+    padding: 15px;
+    margin: 8px 0;
+    text-align: center;
+}
+.funnel-box h3 {
+    margin: 0 0 5px 0;
+    font-size: 24px;
+    color: var(--funnel-color);
+}
+.funnel-box p {
+    margin: 0;
+    font-size: 14px;
+    color: #888;
+}
+.funnel-arrow {
+    text-align: center;
+    font-size: 24px;
+    color: #555;
+    margin: 5px 0;
+}
+.funnel-split {
+    display: flex;
+    justify-content: space-around;
+    gap: 10px;
+}
+.funnel-split-box {
+    flex: 1;
+    background: #1a1a2e;
+    border-radius: 8px;
+    padding: 12px;
+    text-align: center;
+}
+.funnel-split-box.green { border-left: 3px solid #4CAF50; }
+.funnel-split-box.red { border-left: 3px solid #f44336; }
+.funnel-split-box.yellow { border-left: 3px solid #ff9800; }
+.funnel-split-box.blue { border-left: 3px solid #2196F3; }
+</style>
+"""
+
 # --- Supabase Connection ---
+def pool_postgrest_session(client):
+    """Swap the PostgREST session for a pooled httpx client with explicit keep-alive limits.
+
+    Lets the parallel chunk queries reuse warm TCP/TLS connections, and
+    negotiates HTTP/2 when the optional h2 package is installed.
+    """
+    postgrest = getattr(client, 'postgrest', None)
+    session = getattr(postgrest, 'session', None)
+    if not isinstance(session, httpx.Client):
+        return
+    postgrest.session = httpx.Client(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=session.follow_redirects,
+        http2=importlib.util.find_spec('h2') is not None,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+    )
+    session.close()
+
+
+@st.cache_resource
+def get_cached_supabase_client():
+    """Get the Supabase client once per process instead of on every rerun."""
+    client = get_supabase_client()
+    pool_postgrest_session(client)
+    return client
+
+
 try:
-    supabase = get_supabase_client()
+    supabase = get_cached_supabase_client()
 except Exception as e:
     st.error(f"Supabase connection failed: {e}")
     st.stop()
 
 
+# --- Disk Cache ---
+def disk_cached(fetch_fn):
+    """Keep a DataFrame fetch result on disk for DISK_CACHE_TTL seconds.
+
+    Used under @st.cache_data so a restarted app reloads a recent snapshot
+    instead of re-scanning user_matches. Empty results are not stored.
+    Snapshots are parquet, so loading one never executes code the way
+    unpickling a file from a writable directory could.
+    """
+    signature = inspect.signature(fetch_fn)
+
+    @functools.wraps(fetch_fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = hashlib.md5(repr((fetch_fn.__name__, sorted(bound.arguments.items()))).encode()).hexdigest()
+        path = os.path.join(DISK_CACHE_DIR, f"{key}.parquet")
+        try:
+            if time.time() - os.path.getmtime(path) < DISK_CACHE_TTL:
+                return pd.read_parquet(path)
+        except Exception:
+            pass
+
+        df = fetch_fn(*args, **kwargs)
+        if not df.empty:
+            try:
+                os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                df.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, path)
+            except (OSError, ValueError, TypeError):
+                pass
+        return df
+
+    return wrapper
+
+
+def clear_disk_cache():
+    """Delete all disk snapshots."""
+    shutil.rmtree(DISK_CACHE_DIR, ignore_errors=True)
+
+
 # --- Data Fetching Functions ---
-def fetch_all_paginated(query_builder, page_size=1000):
-    """Fetch all records using pagination to bypass 1000 row limit."""
+def fetch_all_paginated(query_builder, page_size=1000, key_column='match_id'):
+    """Fetch all records using keyset pagination to bypass 1000 row limit.
+
+    Pages are ordered by key_column (which the query must select) and each
+    page starts after the last key seen, so the database never re-scans
+    skipped rows the way a growing OFFSET does.
+    """
     all_data = []
-    offset = 0
+    query_builder = query_builder.order(key_column).limit(page_size)
     while True:
-        res = query_builder.range(offset, offset + page_size - 1).execute()
+        res = query_builder.execute()
         if not res.data:
             break
         all_data.extend(res.data)
         if len(res.data) < page_size:
             break
-        offset += page_size
+        query_builder = query_builder.gt(key_column, res.data[-1][key_column])
     return all_data
 
 
+def fetch_all_paginated_df(build_query, page_size=1000, key_column='match_id'):
+    """Fetch all records into a DataFrame, requesting CSV pages instead of JSON.
+
+    Uses the same keyset pagination as fetch_all_paginated: pages are ordered
+    by key_column and each starts after the last key seen, so rows inserted or
+    deleted mid-scan cannot shift later pages and make them skip or repeat
+    rows. build_query must return a fresh query builder on every call, one per
+    page. Each page is parsed straight into columns by pd.read_csv, so no
+    per-row dicts are built. Only an unquoted empty field is read as NULL; a
+    quoted "" stays an empty string, as in JSON.
+    """
+    def fetch_page(after_key):
+        query = build_query()
+        if after_key is not None:
+            query = query.gt(key_column, after_key)
+        res = query.order(key_column).limit(page_size).csv().execute()
+        if not res.data:
+            return pd.DataFrame()
+        return read_postgrest_csv(res.data, CSV_DTYPES)
+
+    pages = [fetch_page(None)]
+    while len(pages[-1]) == page_size:
+        pages.append(fetch_page(pages[-1][key_column].iloc[-1]))
+    pages = [page for page in pages if not page.empty]
+    if not pages:
+        return pd.DataFrame()
+    return pd.concat(pages, ignore_index=True)
+
+
+def user_ids_key(user_ids):
+    """Normalize user_ids to a sorted tuple so cached lookups hit regardless of input order."""
+    return tuple(sorted(set(user_ids)))
+
+
+@st.cache_resource
+def get_user_row_store():
+    """Per-user rows shared by every session, as {(table, columns): {user_id: (row, fetched_at)}}."""
+    return {}
+
+
+def fetch_rows_by_user_ids(table, columns, user_ids, chunk_size=500):
+    """Fetch rows for user_ids in chunks to avoid query limits, running the chunk queries in parallel.
+
+    Rows (or their absence) are remembered per user for USER_ROW_TTL seconds,
+    so only ids not seen recently are requested.
+    """
+    def fetch_chunk(chunk):
+        res = supabase.table(table).select(columns).in_('user_id', chunk).execute()
+        return res.data or []
+
+    store = get_user_row_store().setdefault((table, columns), {})
+    now = time.time()
+    # Read the store once up front; other sessions may update or clear it meanwhile
+    cached = {uid: store.get(uid, (None, 0)) for uid in user_ids}
+    rows = {uid: row for uid, (row, fetched_at) in cached.items() if now - fetched_at < USER_ROW_TTL}
+    missing = [uid for uid in cached if uid not in rows]
+    if missing:
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            fetched = {row['user_id']: row for chunk_rows in executor.map(fetch_chunk, chunks) for row in chunk_rows}
+        if len(store) + len(missing) > USER_ROW_MAX_ENTRIES:
+            store.clear()
+        for uid in missing:
+            rows[uid] = fetched.get(uid)
+            store[uid] = (rows[uid], now)
+    return [row for row in rows.values() if row is not None]
+
+
 @st.cache_data(ttl=300)
 def fetch_filter_options():
     """Fetch distinct run_ids and origin_phases for filter dropdowns."""
     try:
-        # Get distinct run_ids - paginated
-        run_data = fetch_all_paginated(supabase.table('user_matches').select('run_id'))
-        run_ids = list(set(r['run_id'] for r in run_data if r.get('run_id')))
-
-        # Get distinct origin_phases - paginated
-        phase_data = fetch_all_paginated(supabase.table('user_matches').select('origin_phase'))
-        phases = list(set(p['origin_phase'] for p in phase_data if p.get('origin_phase')))
+        # Single paginated scan of both filter columns, reduced to distinct values
+        filter_data = fetch_all_paginated(supabase.table('user_matches').select('match_id, run_id, origin_phase'))
+        run_ids = {r['run_id'] for r in filter_data if r.get('run_id')}
+        phases = {r['origin_phase'] for r in filter_data if r.get('origin_phase')}
 
         return sorted(run_ids), sorted(phases)
     except Exception as e:
@@ -69,9 +291,10 @@ def fetch_filter_options():
 
 
 @st.cache_data(ttl=300)
+@disk_cached
 def fetch_overview_stats(run_id=None, origin_phase=None, start_date=None, end_date=None):
-    """Fetch matches with optional filters for overview stats."""
-    try:
+    """Fetch matches with optional filters for overview stats as a DataFrame."""
+    def build_query():
         query = supabase.table('user_matches').select(
             'match_id, current_user_id, matched_user_id, is_liked, is_viewed, is_mutual, mutual_score, know_more_count, origin_phase, created_at'
         )
@@ -84,57 +307,97 @@ def fetch_overview_stats(run_id=None, origin_phase=None, start_date=None, end_da
             query = query.gte('created_at', str(start_date))
         if end_date:
             query = query.lte('created_at', str(end_date))
+        return query
 
+    try:
         # Fetch all with pagination
-        return fetch_all_paginated(query)
+        return fetch_all_paginated_df(build_query)
     except Exception as e:
         st.error(f"Error fetching overview stats: {e}")
-        return []
+        return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)
+@st.cache_data(ttl=300, max_entries=64)
 def fetch_user_genders(user_ids: tuple):
     """Fetch gender for a list of user_ids from user_metadata."""
     if not user_ids:
         return {}
     try:
-        # Batch fetch in chunks of 500 to avoid query limits
-        gender_map = {}
-        user_ids_list = list(user_ids)
-        for i in range(0, len(user_ids_list), 500):
-            chunk = user_ids_list[i:i+500]
-            res = supabase.table('user_metadata').select('user_id, gender').in_('user_id', chunk).execute()
-            if res.data:
-                for u in res.data:
-                    gender_map[u['user_id']] = u.get('gender')
-        return gender_map
+        rows = fetch_rows_by_user_ids(*USER_GENDER_ROWS, list(user_ids))
+        return {u['user_id']: u.get('gender') for u in rows}
     except Exception as e:
         return {}
 
 
-@st.cache_data(ttl=60)
+# cache_resource keeps one frame per filter set instead of unpickling a fresh copy each
+# rerun; it is shared by every session, so it is only handed out via fetch_matches_with_gender
+@st.cache_resource(ttl=300)
+def _load_matches_with_gender(run_id, origin_phase, start_date, end_date):
+    """Build the shared overview matches frame with the sender's gender attached."""
+    df = fetch_overview_stats(run_id, origin_phase, start_date, end_date)
+    if df.empty:
+        return df
+    # One gender lookup over every sender, shared by all date selections
+    sender_codes, sender_ids = pd.factorize(df['current_user_id'])
+    gender_map = fetch_user_genders(user_ids_key(sender_ids))
+    # Map each distinct sender once, then broadcast to the rows by code
+    sender_genders = pd.Categorical(pd.Series(sender_ids).map(gender_map))
+    # Trailing -1 makes a missing sender (code -1) come out as a missing gender
+    gender_codes = np.append(sender_genders.codes, -1)[sender_codes]
+    df['sender_gender'] = pd.Categorical.from_codes(gender_codes, sender_genders.categories)
+    # Low-cardinality labels compared many times downstream; categoricals compare on int codes
+    for col in ('is_liked', 'origin_phase'):
+        df[col] = df[col].astype('category')
+    # Parse dates and add date column
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['action_date'] = df['created_at'].dt.date
+    return df
+
+
+def fetch_matches_with_gender(run_id=None, origin_phase=None, start_date=None, end_date=None):
+    """Fetch overview matches as a DataFrame with the sender's gender attached.
+
+    Returns a shallow copy of the shared cached frame, so no data is copied
+    but columns a caller adds or replaces stay on its own copy rather than
+    the frame other sessions see. Callers still derive new frames (filters,
+    .assign) rather than writing values into existing columns.
+    """
+    # Positional call so every caller maps to the same cache key
+    return _load_matches_with_gender(run_id, origin_phase, start_date, end_date).copy(deep=False)
+
+
+@st.cache_data(ttl=300, max_entries=512)
 def fetch_user_matches(user_id: str):
     """Fetch all matches for a specific user (as current_user_id or matched_user_id)."""
+    # user_id is interpolated into the or_() filter string below, so only a well-formed
+    # UUID (in canonical form) may reach it; anything else could inject filter syntax
     try:
-        # As current user (outbound)
-        outbound = supabase.table('user_matches').select(
-            'match_id, matched_user_id, is_liked, is_viewed, is_mutual, mutual_score, '
-            'viewer_scores_candidate, candidate_scores_viewer, rank, origin_phase, created_at, know_more_count'
-        ).eq('current_user_id', user_id).order('created_at', desc=True).execute()
-
-        # As matched user (inbound)
-        inbound = supabase.table('user_matches').select(
-            'match_id, current_user_id, is_liked, is_viewed, is_mutual, mutual_score, '
-            'viewer_scores_candidate, candidate_scores_viewer, rank, origin_phase, created_at, know_more_count'
-        ).eq('matched_user_id', user_id).order('created_at', desc=True).execute()
-
-        return outbound.data or [], inbound.data or []
+        user_id = str(uuid.UUID(user_id))
+    except ValueError:
+        st.error(f"Invalid user ID: {user_id}")
+        return [], []
+    try:
+        # Both directions in one round trip, split into outbound/inbound below
+        res = supabase.table('user_matches').select(
+            'match_id, current_user_id, matched_user_id, is_liked, is_viewed, mutual_score, '
+            'rank, origin_phase, created_at, know_more_count'
+        ).or_(f'current_user_id.eq.{user_id},matched_user_id.eq.{user_id}').order('created_at', desc=True).execute()
+
+        rows = res.data or []
+        # Tag each row with its direction and the other user in the match
+        for m in rows:
+            is_outbound = m['current_user_id'] == user_id
+            m['direction'] = 'outbound' if is_outbound else 'inbound'
+            m['partner_user_id'] = m['matched_user_id'] if is_outbound else m['current_user_id']
+        outbound = [m for m in rows if m['current_user_id'] == user_id]
+        inbound = [m for m in rows if m['matched_user_id'] == user_id]
+        return outbound, inbound
     except Exception as e:
         st.error(f"Error fetching user matches: {e}")
         return [], []
 
 
-@st.cache_data(ttl=60)
+@st.cache_data(ttl=300, max_entries=512)
 def fetch_user_profile(user_id: str):
     """Fetch user profile from user_metadata."""
     try:
@@ -147,61 +410,364 @@ def fetch_user_profile(user_id: str):
         return None
 
 
-@st.cache_data(ttl=300)
+@st.cache_data(ttl=300, max_entries=64)
 def fetch_user_contact_batch(user_ids: tuple):
     """Batch fetch user emails and phones from user_data table."""
     if not user_ids:
         return {}, {}
     try:
-        email_map = {}
-        phone_map = {}
-        user_ids_list = list(user_ids)
-        for i in range(0, len(user_ids_list), 500):
-            chunk = user_ids_list[i:i+500]
-            res = supabase.table('user_data').select('user_id, user_email, user_phone').in_('user_id', chunk).execute()
-            if res.data:
-                for u in res.data:
-                    email_map[u['user_id']] = u.get('user_email')
-                    phone_map[u['user_id']] = u.get('user_phone')
+        rows = fetch_rows_by_user_ids(*USER_CONTACT_ROWS, list(user_ids))
+        email_map = {u['user_id']: u.get('user_email') for u in rows}
+        phone_map = {u['user_id']: u.get('user_phone') for u in rows}
         return email_map, phone_map
     except Exception as e:
         return {}, {}
 
 
-@st.cache_data(ttl=300)
+@st.cache_data(ttl=300, max_entries=64)
 def fetch_user_profiles_batch(user_ids: tuple):
     """Batch fetch user profiles from user_metadata."""
     if not user_ids:
         return {}
     try:
-        user_ids_list = list(user_ids)
-        res = supabase.table('user_metadata').select(
-            'user_id, name, age, gender, city, phone_num, profile_images, instagram_images, dob'
-        ).in_('user_id', user_ids_list).execute()
-        return {u['user_id']: u for u in res.data} if res.data else {}
+        rows = fetch_rows_by_user_ids(*USER_PROFILE_ROWS, list(user_ids))
+        return {u['user_id']: u for u in rows}
     except Exception as e:
         return {}
 
 
+def fetch_user_details(user_ids: tuple, with_genders=True):
+    """Fetch profiles, genders and (emails, phones) for user_ids in parallel. Results are cached.
+
+    With with_genders=False the gender lookup is skipped and genders is {}.
+
+    The three row lookups run concurrently in worker threads and fill the
+    per-user row store; they make no Streamlit calls. The cached fetchers then
+    run on the script thread, where their spinners and errors can render, and
+    read the rows from the store.
+    """
+    ids = list(user_ids)
+    lookups = [USER_PROFILE_ROWS, USER_CONTACT_ROWS] + ([USER_GENDER_ROWS] if with_genders else [])
+    # Failures are left to the cached fetchers below, which retry and report them
+    with ThreadPoolExecutor(max_workers=len(lookups)) as executor:
+        for table, columns in lookups:
+            executor.submit(fetch_rows_by_user_ids, table, columns, ids)
+    genders = fetch_user_genders(user_ids) if with_genders else {}
+    return fetch_user_profiles_batch(user_ids), genders, fetch_user_contact_batch(user_ids)
+
+
 @st.cache_data(ttl=300)
-def fetch_daily_stats(days=30, run_id=None, origin_phase=None):
-    """Fetch matches for time-series trends."""
-    try:
-        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-        query = supabase.table('user_matches').select(
-            'created_at, is_liked, is_viewed, is_mutual'
-        ).gte('created_at', start_date)
+def fetch_daily_trends(days=30, run_id=None, origin_phase=None):
+    """Aggregate daily match counts, likes, views and rates for the Trends tab.
+
+    Returns None when there are no matches in the time range.
+    """
+    # Rolled up from the unbounded overview fetch the other tabs already load,
+    # instead of a second scan of user_matches for the time range. All four arguments are
+    # passed because the cache key covers only the arguments given, not their defaults
+    df = fetch_matches_with_gender(run_id, origin_phase, None, None)
+    if df.empty:
+        return None
+    start_date = (datetime.now() - timedelta(days=days)).date()
+    df = df[df['action_date'] >= start_date].rename(columns={'action_date': 'date'})
+    if df.empty:
+        return None
 
-        if run_id:
-            query = query.eq('run_id', run_id)
-        if origin_phase:
-            query = query.eq('origin_phase', origin_phase)
+    # Daily matches, likes and views in one groupby over precomputed boolean columns
+    # (== True keeps NULL is_viewed uncounted, which astype(bool) would not)
+    daily_engagement = df.assign(
+        liked=df['is_liked'] == 'liked',
+        viewed=df['is_viewed'] == True,
+    ).groupby('date').agg(
+        matches=('match_id', 'size'),
+        likes=('liked', 'sum'),
+        views=('viewed', 'sum'),
+    ).reset_index()
+    daily_engagement['like_rate'] = (daily_engagement['likes'] / daily_engagement['matches'] * 100).round(1)
+    daily_engagement['view_rate'] = (daily_engagement['views'] / daily_engagement['matches'] * 100).round(1)
+    return daily_engagement
+
+
+def calc_stats(counts):
+    """Turn one bucket's summed counts into the core and engagement metrics."""
+    total = int(counts['total'])
+    liked, disliked, passed = int(counts['liked']), int(counts['disliked']), int(counts['passed'])
+    viewed, mutual = int(counts['viewed']), int(counts['mutual'])
+    return {
+        'total': total,
+        'liked': liked,
+        'disliked': disliked,
+        'passed': passed,
+        'viewed': viewed,
+        'mutual': mutual,
+        'avg_mutual': counts['mutual_score'] / counts['mutual_n'] if counts['mutual_n'] else float('nan'),
+        'avg_know': counts['know_more_count'] / counts['know_n'] if counts['know_n'] else float('nan'),
+        'like_rate': (liked / total * 100) if total > 0 else 0,
+        'dislike_rate': (disliked / total * 100) if total > 0 else 0,
+        'pass_rate': (passed / total * 100) if total > 0 else 0,
+        'view_rate': (viewed / total * 100) if total > 0 else 0,
+        'mutual_rate': (mutual / total * 100) if total > 0 else 0,
+    }
 
-        # Fetch all with pagination
-        return fetch_all_paginated(query)
-    except Exception as e:
-        st.error(f"Error fetching daily stats: {e}")
-        return []
+
+@st.cache_data(ttl=300)
+def fetch_overview_aggregates(run_id=None, origin_phase=None, start_date=None, end_date=None, action_date=None):
+    """Aggregate overview metrics per sender gender and per origin phase.
+
+    Returns None when no matches fall on action_date (or in the filters).
+    """
+    df = fetch_matches_with_gender(run_id, origin_phase, start_date, end_date)
+    if not df.empty and action_date is not None:
+        df = df[df['action_date'] == action_date]
+    if df.empty:
+        return None
+
+    # Built-in reductions only, so each column is aggregated in one vectorised pass
+    phase_stats = df.assign(is_like=df['is_liked'] == 'liked').groupby('origin_phase', observed=True).agg({
+        'match_id': 'count',
+        'is_like': 'sum',
+        'is_viewed': 'sum',
+        'mutual_score': 'mean'
+    }).reset_index()
+    phase_stats.columns = ['Origin Phase', 'Total', 'Likes', 'Views', 'Avg Score']
+    phase_stats['Like Rate %'] = (phase_stats['Likes'] / phase_stats['Total'] * 100).round(1)
+    phase_stats['Avg Score'] = phase_stats['Avg Score'].round(2)
+
+    # One grouped pass gives a row of counts per sender gender; their sum is the combined row
+    bucket_counts = df.assign(
+        total=1,
+        liked=df['is_liked'] == 'liked',
+        disliked=df['is_liked'] == 'disliked',
+        passed=df['is_liked'] == 'passed',
+        viewed=df['is_viewed'],
+        mutual=df['is_mutual'],
+        mutual_n=df['mutual_score'].notna(),
+        know_n=df['know_more_count'].notna(),
+    ).groupby('sender_gender', observed=True, dropna=False)[[
+        'total', 'liked', 'disliked', 'passed', 'viewed', 'mutual',
+        'mutual_score', 'mutual_n', 'know_more_count', 'know_n',
+    ]].sum()
+    no_matches = pd.Series(0, index=bucket_counts.columns)
+
+    return {
+        'combined': calc_stats(bucket_counts.sum()),
+        'male': calc_stats(bucket_counts.loc['male'] if 'male' in bucket_counts.index else no_matches),
+        'female': calc_stats(bucket_counts.loc['female'] if 'female' in bucket_counts.index else no_matches),
+        'phase_stats': phase_stats[['Origin Phase', 'Total', 'Likes', 'Like Rate %', 'Views', 'Avg Score']],
+    }
+
+
+@st.cache_data(ttl=300)
+def fetch_likes_received(run_id=None, origin_phase=None, start_date=None, end_date=None):
+    """Rank the users who received likes, split by their gender, for the Male/Female Likes tabs.
+
+    Returns {'male': counts, 'female': counts}, each a Series of likes received
+    indexed by user_id, most liked first; or None when nobody received a like.
+    """
+    df = fetch_matches_with_gender(run_id, origin_phase, start_date, end_date)
+    if df.empty:
+        return None
+    counts = df.loc[df['is_liked'].eq('liked'), 'matched_user_id'].value_counts()
+    if counts.empty:
+        return None
+    genders = counts.index.map(fetch_user_genders(user_ids_key(counts.index)))
+    return {gender: counts[genders == gender] for gender in ('male', 'female')}
+
+
+def find_mutual_pairs(actions):
+    """Find every user pair that matched on some day, using the Mutual Likes rules.
+
+    A pair matches when, on the same action_date:
+    - both users liked each other, or
+    - one liked and the other passed, and the passing user liked earlier, or
+    - one liked, the other has no row that day, and the other user liked earlier.
+
+    The rules are symmetric, so matching is done with one self-merge of the
+    day's actions instead of walking the days in order. Returns a DataFrame
+    of unique (user_1, user_2) pairs with user_1 < user_2.
+    """
+    keys = ['action_date', 'current_user_id', 'matched_user_id']
+    day_actions = actions[keys + ['is_liked']].copy()
+    day_actions['action_date'] = pd.to_datetime(day_actions['action_date'])
+
+    # Earliest day each user liked the other
+    first_like = (
+        day_actions[day_actions['is_liked'] == 'liked']
+        .groupby(['current_user_id', 'matched_user_id'])['action_date'].min()
+    )
+
+    # Last row per pair per day wins
+    day_actions = day_actions.drop_duplicates(keys, keep='last')
+
+    # Join each action with the other user's action on the same day
+    reverse = day_actions.rename(columns={
+        'current_user_id': 'matched_user_id',
+        'matched_user_id': 'current_user_id',
+        'is_liked': 'other_action',
+    })
+    pairs = day_actions.merge(reverse, on=keys, how='left', indicator=True)
+    # A reverse row whose action is null counts as no row that day
+    no_other_action = (pairs['_merge'].eq('left_only') | pairs['other_action'].isna()).to_numpy()
+
+    # Earlier likes in both directions (NaT when there is none)
+    other_like = pd.MultiIndex.from_arrays([pairs['matched_user_id'], pairs['current_user_id']])
+    own_like = pd.MultiIndex.from_arrays([pairs['current_user_id'], pairs['matched_user_id']])
+    other_liked_before = first_like.reindex(other_like).to_numpy() < pairs['action_date'].to_numpy()
+    own_liked_before = first_like.reindex(own_like).to_numpy() < pairs['action_date'].to_numpy()
+
+    action = pairs['is_liked']
+    other_action = pairs['other_action']
+    is_match = (
+        ((action == 'liked') & (other_action == 'liked'))
+        | ((action == 'liked') & (other_action == 'passed') & other_liked_before)
+        | ((action == 'passed') & (other_action == 'liked') & own_liked_before)
+        | ((action == 'liked') & no_other_action & other_liked_before)
+    )
+
+    matched = pairs[is_match]
+    user_a = matched['current_user_id'].to_numpy()
+    user_b = matched['matched_user_id'].to_numpy()
+    first_is_a = user_a < user_b
+    return pd.DataFrame({
+        'user_1': np.where(first_is_a, user_a, user_b),
+        'user_2': np.where(first_is_a, user_b, user_a),
+    }).drop_duplicates(ignore_index=True)
+
+
+def find_daily_matches(actions):
+    """Evaluate the Mutual Likes rules day by day, returning (matches, missed) DataFrames.
+
+    actions must have NULL actions already treated as 'passed'. Each pair is
+    judged once per day, in the direction seen first that day (user_1 ->
+    user_2), on the last action each user took towards the other. Once a
+    pair has matched it is not reported again on later days. Rows are ordered
+    by day, then by first appearance within the day.
+    """
+    keys = ['action_date', 'current_user_id', 'matched_user_id']
+    day_actions = actions[keys + ['is_liked', 'mutual_score', 'origin_phase', 'created_at']].reset_index(drop=True)
+    # Position of each (day, user, other) in first-appearance order
+    day_actions['first_seen'] = day_actions.groupby(keys, sort=False).ngroup()
+    # Last action per pair per day wins
+    day_actions = day_actions.drop_duplicates(keys, keep='last')
+
+    # Join each action with the other user's action on the same day
+    reverse = day_actions[keys + ['is_liked', 'first_seen']].rename(columns={
+        'current_user_id': 'matched_user_id',
+        'matched_user_id': 'current_user_id',
+        'is_liked': 'action_2',
+        'first_seen': 'other_seen',
+    })
+    pairs = day_actions.merge(reverse, on=keys, how='left')
+    # Keep one row per pair per day, in the direction seen first
+    pairs = pairs[pairs['other_seen'].isna() | (pairs['first_seen'] <= pairs['other_seen'])]
+    pairs = pairs.rename(columns={
+        'current_user_id': 'user_1',
+        'matched_user_id': 'user_2',
+        'is_liked': 'action_1',
+        'action_date': 'match_date',
+    })
+
+    # Earliest day each user liked the other, compared as timestamps (NaT when there is none)
+    likes = actions[actions['is_liked'] == 'liked']
+    first_like = pd.to_datetime(likes['action_date']).groupby(
+        [likes['current_user_id'], likes['matched_user_id']]
+    ).min()
+    day = pd.to_datetime(pairs['match_date']).to_numpy()
+    other_liked_before = first_like.reindex(
+        pd.MultiIndex.from_arrays([pairs['user_2'], pairs['user_1']])
+    ).to_numpy() < day
+    own_liked_before = first_like.reindex(
+        pd.MultiIndex.from_arrays([pairs['user_1'], pairs['user_2']])
+    ).to_numpy() < day
+
+    has_other = pairs['other_seen'].notna().to_numpy()
+    action_1 = pairs['action_1'].to_numpy()
+    action_2 = pairs['action_2'].to_numpy()
+    liked_liked = has_other & (action_1 == 'liked') & (action_2 == 'liked')
+    liked_passed = has_other & (action_1 == 'liked') & (action_2 == 'passed')
+    passed_liked = has_other & (action_1 == 'passed') & (action_2 == 'liked')
+    liked_alone = ~has_other & (action_1 == 'liked')
+
+    pairs['match_type'] = np.select(
+        [
+            liked_liked,
+            liked_passed & other_liked_before,
+            passed_liked & own_liked_before,
+            liked_alone & other_liked_before,
+        ],
+        ['Like + Like', 'Like + Passed (prev like)', 'Passed + Like (prev like)', 'Like + Previous Like'],
+        default='',
+    )
+    # Every other same-day combination of like/pass/dislike is a missed match
+    labels = {'liked': 'Like', 'passed': 'Passed', 'disliked': 'Dislike'}
+    pairs['missed_reason'] = np.select(
+        [
+            liked_passed & ~other_liked_before,
+            passed_liked & ~own_liked_before,
+            has_other & ~(liked_liked | liked_passed | passed_liked)
+            & pairs['action_1'].isin(list(labels)).to_numpy() & pairs['action_2'].isin(list(labels)).to_numpy(),
+        ],
+        [
+            'Like + Passed (no prev like)',
+            'Passed + Like (no prev like)',
+            (pairs['action_1'].map(labels) + ' + ' + pairs['action_2'].map(labels)).to_numpy(),
+        ],
+        default='',
+    )
+
+    # A pair is only reported up to the day it first matches
+    user_1 = pairs['user_1'].to_numpy()
+    user_2 = pairs['user_2'].to_numpy()
+    first_is_1 = user_1 < user_2
+    pair_key = pd.MultiIndex.from_arrays([
+        np.where(first_is_1, user_1, user_2),
+        np.where(first_is_1, user_2, user_1),
+    ])
+    is_match = pairs['match_type'].to_numpy() != ''
+    first_match_day = pd.Series(day[is_match], index=pair_key[is_match]).groupby(level=[0, 1]).min()
+    pairs['reported'] = ~(first_match_day.reindex(pair_key).to_numpy() < day)
+    pairs['day'] = day
+
+    pairs = pairs[pairs['reported']].sort_values(['day', 'first_seen'])
+    matches = pairs[pairs['match_type'] != ''][
+        ['user_1', 'user_2', 'match_date', 'match_type', 'mutual_score', 'origin_phase', 'created_at']
+    ]
+    missed = pairs[pairs['missed_reason'] != ''][
+        ['user_1', 'user_2', 'match_date', 'missed_reason', 'action_1', 'action_2',
+         'mutual_score', 'origin_phase', 'created_at']
+    ]
+    return matches.reset_index(drop=True), missed.reset_index(drop=True)
+
+
+@st.cache_data(ttl=300)
+def fetch_mutual_outcomes(run_id=None, origin_phase=None, start_date=None, end_date=None):
+    """Run the Mutual Likes day rules for the Mutual Likes and Per User tabs.
+
+    Returns (daily_matches, daily_missed, action_history), where
+    action_history maps (user_from, user_to) to that user's actions in date
+    order; or None when there are no like/dislike/pass actions.
+    """
+    df = fetch_matches_with_gender(run_id, origin_phase, start_date, end_date)
+    if df.empty:
+        return None
+    # NULL actions are treated as 'passed'
+    actions = df[
+        ['current_user_id', 'matched_user_id', 'is_liked', 'action_date', 'mutual_score', 'origin_phase', 'created_at']
+    ].assign(is_liked=df['is_liked'].astype(object).fillna('passed'))
+    actions = actions[actions['is_liked'].isin(['liked', 'disliked', 'passed'])]
+    if actions.empty:
+        return None
+
+    daily_matches, daily_missed = find_daily_matches(actions)
+
+    # {(user_from, user_to): [{'date', 'action'}, ...]}, oldest first
+    ordered = actions.sort_values('action_date', kind='stable')
+    action_history = {}
+    for user_from, user_to, action_date, action in zip(
+        ordered['current_user_id'], ordered['matched_user_id'], ordered['action_date'], ordered['is_liked']
+    ):
+        action_history.setdefault((user_from, user_to), []).append({'date': action_date, 'action': action})
+    return daily_matches, daily_missed, action_history
 
 
 def calculate_age_from_dob(dob_str: str) -> int | None:
@@ -231,9 +797,11 @@ def calculate_age_from_dob(dob_str: str) -> int | None:
 def display_user_images(photos: list, height: int = 300):
     """Display user photos in a horizontal scrollable container."""
     if photos and isinstance(photos, list):
-        images_html = ""
-        for url in photos[:10]:  # Limit to 10 images
-            images_html += f'<img src="{url}" style="height: {height}px; width: auto; object-fit: cover; border-radius: 8px; flex-shrink: 0;">'
+        images_html = "".join(
+            f'<img src="{html.escape(str(url))}" loading="lazy" decoding="async" '
+            f'style="height: {height}px; width: auto; object-fit: cover; border-radius: 8px; flex-shrink: 0;">'
+            for url in photos[:10]  # Limit to 10 images; off-screen ones load on scroll
+        )
 
         st.markdown(f"""
         <div style="
@@ -295,6 +863,114 @@ def display_profile_card(user_data: dict):
     display_user_images(photos, height=350)
 
 
+def display_metric_grid(rows, column_stats):
+    """Display a Metric | Combined | Male | Female table as one st.dataframe.
+
+    rows: (label, stats key, value format, rate key or None) per table row.
+    column_stats: the stats dicts for the Combined, Male and Female columns.
+    """
+    def format_cell(stats, key, value_fmt, rate_key):
+        value = value_fmt.format(stats[key]) if pd.notna(stats[key]) else "N/A"
+        return f"{value} ({stats[rate_key]:.1f}%)" if rate_key else value
+
+    grid = pd.DataFrame(
+        [[label] + [format_cell(stats, key, value_fmt, rate_key) for stats in column_stats]
+         for label, key, value_fmt, rate_key in rows],
+        columns=['Metric', 'Combined', 'Male', 'Female'],
+    )
+    st.dataframe(grid, use_container_width=True, hide_index=True)
+
+
+def display_likes_card(entry: dict):
+    """Display a Likes tab user card as a single HTML element.
+
+    The photo is lazy-loaded, so collapsed expanders don't fetch it until opened.
+    """
+    photo = entry['photos'][0] if entry['photos'] else None
+    if photo:
+        photo_html = f'<img src="{html.escape(str(photo))}" loading="lazy" decoding="async" style="width: 150px; border-radius: 8px;">'
+    else:
+        photo_html = '<p>No photo</p>'
+    fields = [
+        ('Name', entry['name']),
+        ('Likes Received', entry['likes']),
+        ('Phone', entry['phone']),
+        ('Email', entry['email']),
+    ]
+    fields_html = "".join(f'<p><strong>{label}:</strong> {html.escape(str(value))}</p>' for label, value in fields)
+    st.markdown(f"""
+    <div style="display: flex; gap: 16px;">
+        <div style="flex: 1;">{photo_html}</div>
+        <div style="flex: 3;">{fields_html}<p><strong>User ID:</strong> <code>{html.escape(str(entry['user_id']))}</code></p></div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def summarize_profiles(profiles: dict) -> dict:
+    """Map each user_id to its (name, age, thumbnail), resolved once per profile."""
+    summaries = {}
+    for uid, profile in profiles.items():
+        photos = profile.get('profile_images') or profile.get('instagram_images') or []
+        dob = profile.get('dob')
+        age = calculate_age_from_dob(dob) if dob else profile.get('age')
+        summaries[uid] = (profile.get('name', 'Unknown'), age, photos[0] if photos else None)
+    return summaries
+
+
+def select_likes_page(user_ids: list, key: str):
+    """Render a page picker for a Likes tab and return (start index, user_ids on that page)."""
+    total_pages = max(1, (len(user_ids) + LIKES_PAGE_SIZE - 1) // LIKES_PAGE_SIZE)
+    # Reset if the filters shrank the list below the current page (before the widget exists)
+    if st.session_state.get(key, 1) > total_pages:
+        st.session_state[key] = 1
+    page = st.number_input(f"Page (1–{total_pages})", min_value=1, max_value=total_pages, step=1, key=key)
+    start = (page - 1) * LIKES_PAGE_SIZE
+    return start, user_ids[start:start + LIKES_PAGE_SIZE]
+
+
+def show_more(key: str, count: int):
+    """Button callback: show count items of the list whose length is kept under key."""
+    st.session_state[key] = count
+
+
+def display_match_list(matches: list, summaries: dict):
+    """Display every match as a collapsible <details> card in a single HTML element.
+
+    Each card shows the partner's profile and the match details; the browser
+    handles expanding, and thumbnails are lazy-loaded so closed cards don't fetch them.
+    """
+    def esc(value):
+        return html.escape(str(value))
+
+    cards = []
+    for match in matches:
+        partner_id = match['partner_user_id']
+        name, age, thumb = summaries.get(partner_id, ('Unknown', None, None))
+        age_display = f", {age}" if age else ""
+        status = match.get('is_liked', 'N/A')
+        if thumb:
+            photo_html = f'<img src="{esc(thumb)}" loading="lazy" decoding="async" width="100">'
+        else:
+            photo_html = '<p>No photo</p>'
+        details_html = (
+            f'<p><strong>Age:</strong> {esc(age if age else "N/A")} | <strong>Status:</strong> {esc(status)} | '
+            f'<strong>Viewed:</strong> {esc(match.get("is_viewed", False))}</p>'
+            f'<p><strong>Mutual Score:</strong> {esc(match.get("mutual_score", "N/A"))} | '
+            f'<strong>Rank:</strong> {esc(match.get("rank", "N/A"))}</p>'
+            f'<p><strong>Phase:</strong> {esc(match.get("origin_phase", "N/A"))} | '
+            f'<strong>Date:</strong> {esc(match.get("created_at", "N/A"))}</p>'
+            f'<p><strong>Know More Count:</strong> {esc(match.get("know_more_count", 0))}</p>'
+        )
+        cards.append(
+            f'<details style="border: 1px solid rgba(128, 128, 128, 0.3); border-radius: 8px; padding: 8px 12px; margin-bottom: 8px;">'
+            f'<summary style="cursor: pointer;">{esc(name)}{esc(age_display)} ({esc(partner_id[:8])}...) - {esc(status)}</summary>'
+            f'<div style="display: flex; gap: 16px; margin-top: 8px;">'
+            f'<div style="flex: 1;">{photo_html}</div><div style="flex: 3;">{details_html}</div>'
+            f'</div></details>'
+        )
+    st.markdown("".join(cards), unsafe_allow_html=True)
+
+
 # --- Session State Initialization ---
 if 'ms_search_user_id' not in st.session_state:
     st.session_state.ms_search_user_id = ""
@@ -308,8 +984,13 @@ if 'ms_last_phase' not in st.session_state:
 # Refresh button - only clears main data cache, not user profiles/genders
 if st.sidebar.button("Refresh Data", use_container_width=True, type="primary"):
     # Clear only the main data fetching caches
+    clear_disk_cache()
     fetch_overview_stats.clear()
-    fetch_daily_stats.clear()
+    _load_matches_with_gender.clear()
+    fetch_overview_aggregates.clear()
+    fetch_likes_received.clear()
+    fetch_mutual_outcomes.clear()
+    fetch_daily_trends.clear()
     st.rerun()
 
 # Set filters to None (no filtering)
@@ -326,247 +1007,115 @@ st.title("Match Stats")
 tab_overview, tab_funnel, tab_user, tab_mutual, tab_per_user, tab_male_likes, tab_female_likes, tab_trends = st.tabs(["Overview", "Funnel", "User Search", "Mutual Likes", "Per User Matches", "Male Likes", "Female Likes", "Trends"])
 
 
+# Fetch data with filters once, shared by every matches tab
+overview_df = fetch_matches_with_gender(
+    run_id=run_id_filter,
+    origin_phase=phase_filter,
+    start_date=start_date,
+    end_date=end_date
+)
+overview_dates = [] if overview_df.empty else sorted(overview_df['action_date'].unique())
+
+# Day-by-day Mutual Likes outcomes, shared by the Mutual Likes and Per User tabs
+mutual_outcomes = fetch_mutual_outcomes(
+    run_id=run_id_filter,
+    origin_phase=phase_filter,
+    start_date=start_date,
+    end_date=end_date
+)
+
+# Likes received per user, ranked within each gender, shared by the Male/Female Likes tabs
+likes_received = fetch_likes_received(
+    run_id=run_id_filter,
+    origin_phase=phase_filter,
+    start_date=start_date,
+    end_date=end_date
+)
+
+
 # --- Tab 1: Overview ---
-with tab_overview:
+@st.fragment
+def render_overview_tab(overview_df, overview_dates):
+    """Render the Overview tab: core/engagement metric grids and the phase breakdown."""
     st.subheader("Match Overview")
 
-    # Fetch data with filters
-    matches_data = fetch_overview_stats(
-        run_id=run_id_filter,
-        origin_phase=phase_filter,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    if not matches_data:
+    if overview_df.empty:
         st.info("No matches found for the selected filters.")
     else:
-        df = pd.DataFrame(matches_data)
-
-        # Parse dates and add date column
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        df['action_date'] = df['created_at'].dt.date
-
         # Get unique dates for dropdown
-        unique_overview_dates = sorted(df['action_date'].unique())
-        overview_date_options = ["All Dates"] + [str(d) for d in unique_overview_dates]
+        overview_date_options = ["All Dates"] + [str(d) for d in overview_dates]
         selected_overview_date = st.selectbox("Filter by Date", options=overview_date_options, index=0, key="overview_date_filter")
 
         # Filter by selected date
+        selected_overview_date_obj = None
         if selected_overview_date != "All Dates":
             selected_overview_date_obj = datetime.strptime(selected_overview_date, '%Y-%m-%d').date()
-            df = df[df['action_date'] == selected_overview_date_obj]
 
-        if len(df) == 0:
+        overview_stats = fetch_overview_aggregates(
+            run_id=run_id_filter,
+            origin_phase=phase_filter,
+            start_date=start_date,
+            end_date=end_date,
+            action_date=selected_overview_date_obj
+        )
+
+        if overview_stats is None:
             st.info("No data for the selected date.")
         else:
-            total_count = len(df)
-
-            # Fetch gender data for all current_user_ids
-            all_user_ids = tuple(sorted(set(df['current_user_id'].tolist())))
-            with st.spinner("Loading gender data..."):
-                gender_map = fetch_user_genders(all_user_ids)
-
-            # Add gender column to dataframe
-            df['sender_gender'] = df['current_user_id'].map(gender_map)
-
-            # Split data by gender
-            df_male = df[df['sender_gender'] == 'male']
-            df_female = df[df['sender_gender'] == 'female']
-
-            # Calculate all stats for combined, male, female
-            def calc_stats(data):
-                total = len(data)
-                liked = len(data[data['is_liked'] == 'liked'])
-                disliked = len(data[data['is_liked'] == 'disliked'])
-                passed = len(data[data['is_liked'] == 'passed'])
-                viewed = int(data['is_viewed'].sum()) if 'is_viewed' in data.columns else 0
-                mutual = int(data['is_mutual'].sum()) if 'is_mutual' in data.columns else 0
-                avg_mutual = data['mutual_score'].dropna().mean()
-                avg_know = data['know_more_count'].dropna().mean()
-                return {
-                    'total': total,
-                    'liked': liked,
-                    'disliked': disliked,
-                    'passed': passed,
-                    'viewed': viewed,
-                    'mutual': mutual,
-                    'avg_mutual': avg_mutual,
-                    'avg_know': avg_know,
-                    'like_rate': (liked / total * 100) if total > 0 else 0,
-                    'dislike_rate': (disliked / total * 100) if total > 0 else 0,
-                    'pass_rate': (passed / total * 100) if total > 0 else 0,
-                    'view_rate': (viewed / total * 100) if total > 0 else 0,
-                    'mutual_rate': (mutual / total * 100) if total > 0 else 0,
-                }
-
-            stats_combined = calc_stats(df)
-            stats_male = calc_stats(df_male)
-            stats_female = calc_stats(df_female)
+            stats_combined = overview_stats['combined']
+            stats_male = overview_stats['male']
+            stats_female = overview_stats['female']
 
             # Display metrics in 3 columns: Combined, Male, Female
-            st.markdown("### Core Metrics")
+            column_stats = [stats_combined, stats_male, stats_female]
 
-            # Headers
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("**Metric**")
-            with col_combined:
-                st.markdown("**Combined**")
-            with col_male:
-                st.markdown("**Male**")
-            with col_female:
-                st.markdown("**Female**")
-
-            # Total Matches
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Total Matches")
-            with col_combined:
-                st.metric("", f"{stats_combined['total']:,}", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['total']:,}", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['total']:,}", label_visibility="collapsed")
-
-            # Likes
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Likes")
-            with col_combined:
-                st.metric("", f"{stats_combined['liked']:,}", f"{stats_combined['like_rate']:.1f}%", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['liked']:,}", f"{stats_male['like_rate']:.1f}%", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['liked']:,}", f"{stats_female['like_rate']:.1f}%", label_visibility="collapsed")
-
-            # Dislikes
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Dislikes")
-            with col_combined:
-                st.metric("", f"{stats_combined['disliked']:,}", f"{stats_combined['dislike_rate']:.1f}%", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['disliked']:,}", f"{stats_male['dislike_rate']:.1f}%", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['disliked']:,}", f"{stats_female['dislike_rate']:.1f}%", label_visibility="collapsed")
-
-            # Passed
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Passed")
-            with col_combined:
-                st.metric("", f"{stats_combined['passed']:,}", f"{stats_combined['pass_rate']:.1f}%", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['passed']:,}", f"{stats_male['pass_rate']:.1f}%", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['passed']:,}", f"{stats_female['pass_rate']:.1f}%", label_visibility="collapsed")
+            st.markdown("### Core Metrics")
+            display_metric_grid([
+                ('Total Matches', 'total', '{:,}', None),
+                ('Likes', 'liked', '{:,}', 'like_rate'),
+                ('Dislikes', 'disliked', '{:,}', 'dislike_rate'),
+                ('Passed', 'passed', '{:,}', 'pass_rate'),
+            ], column_stats)
 
             st.divider()
             st.markdown("### Engagement Metrics")
-
-            # Headers
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("**Metric**")
-            with col_combined:
-                st.markdown("**Combined**")
-            with col_male:
-                st.markdown("**Male**")
-            with col_female:
-                st.markdown("**Female**")
-
-            # Viewed
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Viewed")
-            with col_combined:
-                st.metric("", f"{stats_combined['viewed']:,}", f"{stats_combined['view_rate']:.1f}%", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['viewed']:,}", f"{stats_male['view_rate']:.1f}%", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['viewed']:,}", f"{stats_female['view_rate']:.1f}%", label_visibility="collapsed")
-
-            # Mutual Matches
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Mutual Matches")
-            with col_combined:
-                st.metric("", f"{stats_combined['mutual']:,}", f"{stats_combined['mutual_rate']:.1f}%", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['mutual']:,}", f"{stats_male['mutual_rate']:.1f}%", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['mutual']:,}", f"{stats_female['mutual_rate']:.1f}%", label_visibility="collapsed")
-
-            # Avg Mutual Score
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Avg Mutual Score")
-            with col_combined:
-                st.metric("", f"{stats_combined['avg_mutual']:.2f}" if pd.notna(stats_combined['avg_mutual']) else "N/A", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['avg_mutual']:.2f}" if pd.notna(stats_male['avg_mutual']) else "N/A", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['avg_mutual']:.2f}" if pd.notna(stats_female['avg_mutual']) else "N/A", label_visibility="collapsed")
-
-            # Avg Know More
-            col_label, col_combined, col_male, col_female = st.columns([1.5, 1, 1, 1])
-            with col_label:
-                st.markdown("Avg Know More")
-            with col_combined:
-                st.metric("", f"{stats_combined['avg_know']:.1f}" if pd.notna(stats_combined['avg_know']) else "N/A", label_visibility="collapsed")
-            with col_male:
-                st.metric("", f"{stats_male['avg_know']:.1f}" if pd.notna(stats_male['avg_know']) else "N/A", label_visibility="collapsed")
-            with col_female:
-                st.metric("", f"{stats_female['avg_know']:.1f}" if pd.notna(stats_female['avg_know']) else "N/A", label_visibility="collapsed")
+            display_metric_grid([
+                ('Viewed', 'viewed', '{:,}', 'view_rate'),
+                ('Mutual Matches', 'mutual', '{:,}', 'mutual_rate'),
+                ('Avg Mutual Score', 'avg_mutual', '{:.2f}', None),
+                ('Avg Know More', 'avg_know', '{:.1f}', None),
+            ], column_stats)
 
             st.divider()
 
             # Breakdown by origin_phase
             st.subheader("Breakdown by Origin Phase")
 
-            phase_stats = df.groupby('origin_phase').agg({
-                'match_id': 'count',
-                'is_liked': lambda x: (x == 'liked').sum(),
-                'is_viewed': 'sum',
-                'mutual_score': 'mean'
-            }).reset_index()
-            phase_stats.columns = ['Origin Phase', 'Total', 'Likes', 'Views', 'Avg Score']
-            phase_stats['Like Rate %'] = (phase_stats['Likes'] / phase_stats['Total'] * 100).round(1)
-            phase_stats['Avg Score'] = phase_stats['Avg Score'].round(2)
-
             st.dataframe(
-                phase_stats[['Origin Phase', 'Total', 'Likes', 'Like Rate %', 'Views', 'Avg Score']],
+                overview_stats['phase_stats'],
                 use_container_width=True,
                 hide_index=True
             )
 
 
+with tab_overview:
+    render_overview_tab(overview_df, overview_dates)
+
+
 # --- Tab 2: Funnel ---
-with tab_funnel:
+@st.fragment
+def render_funnel_tab(overview_df, overview_dates):
+    """Render the Funnel tab: per-gender journey funnels and their comparison."""
     st.subheader("User Journey Funnel")
     st.markdown("Breakdown of user actions from recommendations to final decisions")
 
-    # Fetch data with filters
-    funnel_data = fetch_overview_stats(
-        run_id=run_id_filter,
-        origin_phase=phase_filter,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    if not funnel_data:
+    if overview_df.empty:
         st.info("No matches found for the selected filters.")
     else:
-        df_funnel = pd.DataFrame(funnel_data)
-
-        # Parse dates and add date column
-        df_funnel['created_at'] = pd.to_datetime(df_funnel['created_at'])
-        df_funnel['action_date'] = df_funnel['created_at'].dt.date
+        df_funnel = overview_df
 
         # Get unique dates for dropdown
-        unique_funnel_dates = sorted(df_funnel['action_date'].unique())
-        funnel_date_options = ["All Dates"] + [str(d) for d in unique_funnel_dates]
+        funnel_date_options = ["All Dates"] + [str(d) for d in overview_dates]
         selected_funnel_date = st.selectbox("Filter by Date", options=funnel_date_options, index=0, key="funnel_date_filter")
 
         # Filter by selected date
@@ -577,117 +1126,71 @@ with tab_funnel:
         if len(df_funnel) == 0:
             st.info("No data for the selected date.")
         else:
-            # Fetch gender data for all current_user_ids (the person who received the recommendation)
-            all_funnel_user_ids = tuple(sorted(set(df_funnel['current_user_id'].tolist())))
-            with st.spinner("Loading gender data..."):
-                funnel_gender_map = fetch_user_genders(all_funnel_user_ids)
+            # Split by gender of current_user_id (the person who received the recommendation)
+            df_funnel_male = df_funnel[df_funnel['sender_gender'] == 'male']
+            df_funnel_female = df_funnel[df_funnel['sender_gender'] == 'female']
 
-            # Add gender column
-            df_funnel['user_gender'] = df_funnel['current_user_id'].map(funnel_gender_map)
-
-            # Split by gender
-            df_funnel_male = df_funnel[df_funnel['user_gender'] == 'male']
-            df_funnel_female = df_funnel[df_funnel['user_gender'] == 'female']
-
-            def calc_funnel_stats(data, gender_label, full_data):
+            def calc_funnel_stats(data, gender_label, mutual_pairs):
                 """Calculate funnel statistics for a given dataset.
 
                 Args:
                     data: Gender-filtered data for calculating gender-specific stats
                     gender_label: "Male" or "Female"
-                    full_data: Full dataset with both genders for matching algorithm
+                    mutual_pairs: Matched pairs from find_mutual_pairs on the full dataset
                 """
                 total = len(data)
                 if total == 0:
                     return None
 
-                # Unique users (current_user_id = person who received recommendation)
-                unique_users = data['current_user_id'].nunique()
-
                 # Viewed = is_viewed is True
                 viewed = int(data['is_viewed'].sum()) if 'is_viewed' in data.columns else 0
                 not_viewed = total - viewed
 
-                # Unique users who viewed at least one recommendation
-                users_who_viewed = data[data['is_viewed'] == True]['current_user_id'].nunique() if 'is_viewed' in data.columns else 0
-
                 # Actions
-                liked = len(data[data['is_liked'] == 'liked'])
-                disliked = len(data[data['is_liked'] == 'disliked'])
-                passed = len(data[data['is_liked'] == 'passed'])
-
-                # Unique users who took each action
-                users_who_liked = data[data['is_liked'] == 'liked']['current_user_id'].nunique()
-                users_who_disliked = data[data['is_liked'] == 'disliked']['current_user_id'].nunique()
-                users_who_passed = data[data['is_liked'] == 'passed']['current_user_id'].nunique()
+                action_counts = data['is_liked'].value_counts()
+                liked = int(action_counts.get('liked', 0))
+                disliked = int(action_counts.get('disliked', 0))
+                passed = int(action_counts.get('passed', 0))
 
                 # No action = not liked, disliked, or passed (is_liked is null or empty)
                 actioned = liked + disliked + passed
                 no_action = total - actioned
 
-                # Unique users who took any action
-                users_with_action = data[data['is_liked'].isin(['liked', 'disliked', 'passed'])]['current_user_id'].nunique()
+                # Know more (clicked to see more details)
+                know_more_mask = data['know_more_count'] > 0 if 'know_more_count' in data.columns else False
+                know_more_clicked = int(np.sum(know_more_mask))
+
+                # Per-user action counts in one groupby pass (current_user_id = person who received recommendation)
+                per_user = pd.DataFrame({
+                    'current_user_id': data['current_user_id'],
+                    'viewed': data['is_viewed'] == True if 'is_viewed' in data.columns else False,
+                    'liked': data['is_liked'] == 'liked',
+                    'disliked': data['is_liked'] == 'disliked',
+                    'passed': data['is_liked'] == 'passed',
+                    'know_more': know_more_mask,
+                }).groupby('current_user_id').agg(
+                    recs=('viewed', 'size'),
+                    viewed=('viewed', 'sum'),
+                    liked=('liked', 'sum'),
+                    disliked=('disliked', 'sum'),
+                    passed=('passed', 'sum'),
+                    know_more=('know_more', 'sum'),
+                )
+
+                unique_users = len(per_user)
+                users_who_viewed = int((per_user['viewed'] > 0).sum())
+                users_who_liked = int((per_user['liked'] > 0).sum())
+                users_who_disliked = int((per_user['disliked'] > 0).sum())
+                users_who_passed = int((per_user['passed'] > 0).sum())
+                users_with_action = int((per_user[['liked', 'disliked', 'passed']].sum(axis=1) > 0).sum())
                 users_no_action = unique_users - users_with_action
+                users_know_more = int((per_user['know_more'] > 0).sum())
 
-                # Know more (clicked to see more details)
-                know_more_clicked = len(data[data['know_more_count'] > 0]) if 'know_more_count' in data.columns else 0
-                users_know_more = data[data['know_more_count'] > 0]['current_user_id'].nunique() if 'know_more_count' in data.columns else 0
-
-                # Mutual matches - use the same algorithm as Mutual Likes tab
-                # Use full_data (both genders) for the matching algorithm
-                likes_history = {}
-                likes_df = full_data[full_data['is_liked'] == 'liked']
-                for _, row in likes_df.iterrows():
-                    key = (row['current_user_id'], row['matched_user_id'])
-                    like_date = row['action_date']
-                    if key not in likes_history or like_date < likes_history[key]:
-                        likes_history[key] = like_date
-
-                # Find matches using the algorithm with full data
-                matched_users = set()
-                matched_pairs = set()
-                unique_action_dates = sorted(full_data['action_date'].unique())
-
-                for target_date in unique_action_dates:
-                    day_data = full_data[full_data['action_date'] == target_date]
-                    day_action_lookup = {}
-                    for _, row in day_data.iterrows():
-                        key = (row['current_user_id'], row['matched_user_id'])
-                        day_action_lookup[key] = row['is_liked']
-
-                    for (user1, user2), action1 in day_action_lookup.items():
-                        pair_key = tuple(sorted([user1, user2]))
-                        if pair_key in matched_pairs:
-                            continue
-
-                        action2 = day_action_lookup.get((user2, user1))
-                        is_match = False
-
-                        if action2 is not None:
-                            if action1 == 'liked' and action2 == 'liked':
-                                is_match = True
-                            elif action1 == 'liked' and action2 == 'passed':
-                                prev_like_date = likes_history.get((user2, user1))
-                                if prev_like_date and prev_like_date < target_date:
-                                    is_match = True
-                            elif action1 == 'passed' and action2 == 'liked':
-                                prev_like_date = likes_history.get((user1, user2))
-                                if prev_like_date and prev_like_date < target_date:
-                                    is_match = True
-                        else:
-                            if action1 == 'liked':
-                                prev_like_date = likes_history.get((user2, user1))
-                                if prev_like_date and prev_like_date < target_date:
-                                    is_match = True
-
-                        if is_match:
-                            matched_pairs.add(pair_key)
-                            matched_users.add(user1)
-                            matched_users.add(user2)
-
-                mutual = len(matched_pairs)
+                # Mutual matches - computed once on full data (both genders) by find_mutual_pairs
+                mutual = len(mutual_pairs)
                 # Filter to only users from this gender's dataset
                 gender_user_ids = set(data['current_user_id'].unique())
+                matched_users = set(mutual_pairs['user_1']) | set(mutual_pairs['user_2'])
                 users_with_mutual = len(matched_users & gender_user_ids)
 
                 # Profile view distribution (how many profiles each user viewed per day)
@@ -711,7 +1214,7 @@ with tab_funnel:
                     users_viewed_7_9 = 0
 
                 # Recommendations distribution (how many matches/recommendations each user received)
-                recs_per_user = data.groupby('current_user_id').size()
+                recs_per_user = per_user['recs']
                 min_recs = int(recs_per_user.min()) if len(recs_per_user) > 0 else 0
                 max_recs = int(recs_per_user.max()) if len(recs_per_user) > 0 else 0
                 median_recs = float(recs_per_user.median()) if len(recs_per_user) > 0 else 0
@@ -767,9 +1270,10 @@ with tab_funnel:
                     'users_with_gt_9': users_with_gt_9,
                 }
 
-            # Calculate stats for both genders (pass full df_funnel for matching algorithm)
-            male_funnel = calc_funnel_stats(df_funnel_male, "Male", df_funnel)
-            female_funnel = calc_funnel_stats(df_funnel_female, "Female", df_funnel)
+            # Calculate stats for both genders (mutual pairs come from the full df_funnel)
+            funnel_mutual_pairs = find_mutual_pairs(df_funnel)
+            male_funnel = calc_funnel_stats(df_funnel_male, "Male", funnel_mutual_pairs)
+            female_funnel = calc_funnel_stats(df_funnel_female, "Female", funnel_mutual_pairs)
 
             # Display funnel as flow chart
             def display_funnel_chart(stats, gender_label, color):
@@ -778,75 +1282,35 @@ with tab_funnel:
                     st.info(f"No data for {gender_label} users")
                     return
 
-                # CSS for funnel boxes
-                st.markdown(f"""
-                <style>
-                .funnel-box {{
-                    background: linear-gradient(135deg, {color}22, {color}11);
-                    border-left: 4px solid {color};
-                    border-radius: 8px;
-                    padding: 15px;
-                    margin: 8px 0;
-                    text-align: center;
-                }}
-                .funnel-box h3 {{
-                    margin: 0 0 5px 0;
-                    font-size: 24px;
-                    color: {color};
-                }}
-                .funnel-box p {{
-                    margin: 0;
-                    font-size: 14px;
-                    color: #888;
-                }}
-                .funnel-arrow {{
-                    text-align: center;
-                    font-size: 24px;
-                    color: #555;
-                    margin: 5px 0;
-                }}
-                .funnel-split {{
-                    display: flex;
-                    justify-content: space-around;
-                    gap: 10px;
-                }}
-                .funnel-split-box {{
-                    flex: 1;
-                    background: #1a1a2e;
-                    border-radius: 8px;
-                    padding: 12px;
-                    text-align: center;
-                }}
-                .funnel-split-box.green {{ border-left: 3px solid #4CAF50; }}
-                .funnel-split-box.red {{ border-left: 3px solid #f44336; }}
-                .funnel-split-box.yellow {{ border-left: 3px solid #ff9800; }}
-                .funnel-split-box.blue {{ border-left: 3px solid #2196F3; }}
-                </style>
-                """, unsafe_allow_html=True)
-
                 # Title
                 st.markdown(f"### {gender_label} Funnel")
 
+                # Funnel HTML fragments, emitted together in one st.markdown call
+                html_parts = []
+
+                # Per-gender colors for the shared FUNNEL_CSS rules
+                funnel_vars = f"--funnel-color: {color}; --funnel-tint: {color}22; --funnel-tint-light: {color}11;"
+
                 # Stage 1: Users
-                st.markdown(f"""
-                <div class="funnel-box" title="Total number of unique users who received match recommendations in this period">
+                html_parts.append(f"""
+                <div class="funnel-box" style="{funnel_vars}" title="Total number of unique users who received match recommendations in this period">
                     <h3>{stats['unique_users']:,}</h3>
                     <p>Unique Users</p>
                     <p style="font-size:12px; color:#666;">({stats['total_recommendations']:,} recommendations, ~{stats['avg_recs_per_user']:.1f}/user)</p>
                 </div>
                 <div class="funnel-arrow">↓</div>
-                """, unsafe_allow_html=True)
+                """)
 
                 # Stage 2: Viewed
                 viewed_pct = stats['users_viewed_rate']
-                st.markdown(f"""
-                <div class="funnel-box" title="Users who opened/viewed at least one recommended profile. Percentage is of total unique users.">
+                html_parts.append(f"""
+                <div class="funnel-box" style="{funnel_vars}" title="Users who opened/viewed at least one recommended profile. Percentage is of total unique users.">
                     <h3>{stats['users_who_viewed']:,}</h3>
                     <p>Users Viewed ({viewed_pct:.1f}%)</p>
                     <p style="font-size:12px; color:#666;">({stats['viewed']:,} views)</p>
                 </div>
                 <div class="funnel-arrow">↓</div>
-                """, unsafe_allow_html=True)
+                """)
 
                 # Stage 2.5: Viewing Depth Breakdown (how many profiles users viewed)
                 total_viewers = stats['users_viewed_1_3'] + stats['users_viewed_4_6'] + stats['users_viewed_7_9']
@@ -854,7 +1318,7 @@ with tab_funnel:
                     pct_1_3 = (stats['users_viewed_1_3'] / stats['users_who_viewed'] * 100) if stats['users_who_viewed'] > 0 else 0
                     pct_4_6 = (stats['users_viewed_4_6'] / stats['users_who_viewed'] * 100) if stats['users_who_viewed'] > 0 else 0
                     pct_7_9 = (stats['users_viewed_7_9'] / stats['users_who_viewed'] * 100) if stats['users_who_viewed'] > 0 else 0
-                    st.markdown(f"""
+                    html_parts.append(f"""
                     <div style="background: linear-gradient(135deg, #9c27b022, #9c27b011); border-left: 4px solid #9c27b0; border-radius: 8px; padding: 15px; margin: 8px 0; text-align: center;" title="Breakdown of how many profiles each user viewed before taking action or dropping off">
                         <p style="margin: 0 0 10px 0; font-size: 14px; color: #888;">Profiles Viewed per User</p>
                         <div class="funnel-split">
@@ -876,21 +1340,21 @@ with tab_funnel:
                         </div>
                     </div>
                     <div class="funnel-arrow">↓</div>
-                    """, unsafe_allow_html=True)
+                    """)
 
                 # Stage 3: Took Action
                 action_pct = stats['users_action_rate']
-                st.markdown(f"""
-                <div class="funnel-box" title="Users who took at least one action (liked, disliked, or passed) on any recommendation. Percentage is of total unique users.">
+                html_parts.append(f"""
+                <div class="funnel-box" style="{funnel_vars}" title="Users who took at least one action (liked, disliked, or passed) on any recommendation. Percentage is of total unique users.">
                     <h3>{stats['users_with_action']:,}</h3>
                     <p>Users Took Action ({action_pct:.1f}%)</p>
                     <p style="font-size:12px; color:#666;">({stats['any_action']:,} actions)</p>
                 </div>
                 <div class="funnel-arrow">↓</div>
-                """, unsafe_allow_html=True)
+                """)
 
                 # Stage 4: Action breakdown (side by side)
-                st.markdown(f"""
+                html_parts.append(f"""
                 <div class="funnel-split">
                     <div class="funnel-split-box green" title="Users who liked at least one profile. Shows interest in potential matches.">
                         <h4 style="color:#4CAF50; margin:0;">{stats['users_who_liked']:,}</h4>
@@ -908,7 +1372,10 @@ with tab_funnel:
                         <p style="margin:0; font-size:11px; color:#666;">{stats['passed']:,} passes ({stats['passed_rate']:.1f}%)</p>
                     </div>
                 </div>
-                """, unsafe_allow_html=True)
+                """)
+
+                # Fragments are dedented separately so the nested viewing-depth block isn't read as code
+                st.markdown("".join(textwrap.dedent(part) for part in html_parts), unsafe_allow_html=True)
 
                 # Summary metrics
                 st.markdown("---")
@@ -922,7 +1389,8 @@ with tab_funnel:
                 with c4:
                     st.metric("Users with Mutual Likes", f"{stats['users_with_mutual']:,} / {stats['unique_users']:,}", f"{stats['users_with_mutual_rate']:.1f}%")
 
-            # Display both funnels side by side
+            # Display both funnels side by side, sharing one copy of the funnel CSS
+            st.markdown(FUNNEL_CSS, unsafe_allow_html=True)
             col_male, col_female = st.columns(2)
 
             with col_male:
@@ -937,102 +1405,63 @@ with tab_funnel:
             st.subheader("Side-by-Side Comparison")
 
             if male_funnel and female_funnel:
+                # (label, funnel stats key, decimals) for each comparison row
+                comparison_metrics = [
+                    ('Total Recommendations', 'total_recommendations', 0),
+                    ('Unique Users', 'unique_users', 0),
+                    ('Avg Recs/User', 'avg_recs_per_user', 1),
+                    ('Viewed (recs)', 'viewed', 0),
+                    ('Users Viewed', 'users_who_viewed', 0),
+                    ('Viewed Rate (%)', 'viewed_rate', 1),
+                    ('Took Action (recs)', 'any_action', 0),
+                    ('Users Took Action', 'users_with_action', 0),
+                    ('Action Rate (%)', 'any_action_rate', 1),
+                    ('No Action (recs)', 'no_action', 0),
+                    ('Liked (recs)', 'liked', 0),
+                    ('Users Liked', 'users_who_liked', 0),
+                    ('Like Rate (%)', 'liked_rate', 1),
+                    ('Disliked (recs)', 'disliked', 0),
+                    ('Passed (recs)', 'passed', 0),
+                    ('Know More (recs)', 'know_more', 0),
+                    ('Mutual Matches', 'mutual', 0),
+                    ('Conversion Rate (%)', 'conversion_rate', 1),
+                    ('Viewed 1-3 Profiles', 'users_viewed_1_3', 0),
+                    ('Viewed 4-6 Profiles', 'users_viewed_4_6', 0),
+                    ('Viewed 7-9 Profiles', 'users_viewed_7_9', 0),
+                    ('Min Recs/User', 'min_recs', 0),
+                    ('Max Recs/User', 'max_recs', 0),
+                    ('Median Recs/User', 'median_recs', 0),
+                    ('Users < 9 Recs', 'users_with_lt_9', 0),
+                    ('Users = 9 Recs', 'users_with_9', 0),
+                    ('Users > 9 Recs', 'users_with_gt_9', 0),
+                ]
                 comparison_data = {
-                    'Metric': [
-                        'Total Recommendations',
-                        'Unique Users',
-                        'Avg Recs/User',
-                        'Viewed (recs)',
-                        'Users Viewed',
-                        'Viewed Rate',
-                        'Took Action (recs)',
-                        'Users Took Action',
-                        'Action Rate',
-                        'No Action (recs)',
-                        'Liked (recs)',
-                        'Users Liked',
-                        'Like Rate',
-                        'Disliked (recs)',
-                        'Passed (recs)',
-                        'Know More (recs)',
-                        'Mutual Matches',
-                        'Conversion Rate',
-                        'Viewed 1-3 Profiles',
-                        'Viewed 4-6 Profiles',
-                        'Viewed 7-9 Profiles',
-                        'Min Recs/User',
-                        'Max Recs/User',
-                        'Median Recs/User',
-                        'Users < 9 Recs',
-                        'Users = 9 Recs',
-                        'Users > 9 Recs'
-                    ],
-                    'Male': [
-                        f"{male_funnel['total_recommendations']:,}",
-                        f"{male_funnel['unique_users']:,}",
-                        f"{male_funnel['avg_recs_per_user']:.1f}",
-                        f"{male_funnel['viewed']:,}",
-                        f"{male_funnel['users_who_viewed']:,}",
-                        f"{male_funnel['viewed_rate']:.1f}%",
-                        f"{male_funnel['any_action']:,}",
-                        f"{male_funnel['users_with_action']:,}",
-                        f"{male_funnel['any_action_rate']:.1f}%",
-                        f"{male_funnel['no_action']:,}",
-                        f"{male_funnel['liked']:,}",
-                        f"{male_funnel['users_who_liked']:,}",
-                        f"{male_funnel['liked_rate']:.1f}%",
-                        f"{male_funnel['disliked']:,}",
-                        f"{male_funnel['passed']:,}",
-                        f"{male_funnel['know_more']:,}",
-                        f"{male_funnel['mutual']:,}",
-                        f"{male_funnel['conversion_rate']:.1f}%",
-                        f"{male_funnel['users_viewed_1_3']:,}",
-                        f"{male_funnel['users_viewed_4_6']:,}",
-                        f"{male_funnel['users_viewed_7_9']:,}",
-                        f"{male_funnel['min_recs']}",
-                        f"{male_funnel['max_recs']}",
-                        f"{male_funnel['median_recs']:.0f}",
-                        f"{male_funnel['users_with_lt_9']:,}",
-                        f"{male_funnel['users_with_9']:,}",
-                        f"{male_funnel['users_with_gt_9']:,}"
-                    ],
-                    'Female': [
-                        f"{female_funnel['total_recommendations']:,}",
-                        f"{female_funnel['unique_users']:,}",
-                        f"{female_funnel['avg_recs_per_user']:.1f}",
-                        f"{female_funnel['viewed']:,}",
-                        f"{female_funnel['users_who_viewed']:,}",
-                        f"{female_funnel['viewed_rate']:.1f}%",
-                        f"{female_funnel['any_action']:,}",
-                        f"{female_funnel['users_with_action']:,}",
-                        f"{female_funnel['any_action_rate']:.1f}%",
-                        f"{female_funnel['no_action']:,}",
-                        f"{female_funnel['liked']:,}",
-                        f"{female_funnel['users_who_liked']:,}",
-                        f"{female_funnel['liked_rate']:.1f}%",
-                        f"{female_funnel['disliked']:,}",
-                        f"{female_funnel['passed']:,}",
-                        f"{female_funnel['know_more']:,}",
-                        f"{female_funnel['mutual']:,}",
-                        f"{female_funnel['conversion_rate']:.1f}%",
-                        f"{female_funnel['users_viewed_1_3']:,}",
-                        f"{female_funnel['users_viewed_4_6']:,}",
-                        f"{female_funnel['users_viewed_7_9']:,}",
-                        f"{female_funnel['min_recs']}",
-                        f"{female_funnel['max_recs']}",
-                        f"{female_funnel['median_recs']:.0f}",
-                        f"{female_funnel['users_with_lt_9']:,}",
-                        f"{female_funnel['users_with_9']:,}",
-                        f"{female_funnel['users_with_gt_9']:,}"
-                    ]
+                    'Metric': [label for label, _, _ in comparison_metrics],
+                    'Male': [round(float(male_funnel[key]), decimals) for _, key, decimals in comparison_metrics],
+                    'Female': [round(float(female_funnel[key]), decimals) for _, key, decimals in comparison_metrics],
                 }
 
                 comparison_df = pd.DataFrame(comparison_data)
-                st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+                # Numeric columns go to the browser as typed values; formatting happens client-side
+                st.dataframe(
+                    comparison_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        'Male': st.column_config.NumberColumn('Male', format='localized'),
+                        'Female': st.column_config.NumberColumn('Female', format='localized'),
+                    }
+                )
+
+
+with tab_funnel:
+    render_funnel_tab(overview_df, overview_dates)
 
 
 # --- Tab 3: User Search ---
-with tab_user:
+@st.fragment
+def render_user_search_tab():
+    """Render the User Search tab: one user's profile and match history."""
     st.subheader("User Match History")
 
     # Search input
@@ -1047,9 +1476,10 @@ with tab_user:
     with search_col2:
         search_clicked = st.button("Search", type="primary", use_container_width=True)
 
-    if search_clicked and user_search.strip():
-        st.session_state.ms_search_user_id = user_search.strip()
-        st.rerun()
+    # The click already reran this fragment, so the new ID is rendered below without another rerun
+    new_search_id = user_search.strip()
+    if search_clicked and new_search_id:
+        st.session_state.ms_search_user_id = new_search_id
 
     if st.session_state.ms_search_user_id:
         user_id = st.session_state.ms_search_user_id
@@ -1071,18 +1501,21 @@ with tab_user:
             with st.spinner("Loading matches..."):
                 outbound, inbound = fetch_user_matches(user_id)
 
-            # Summary metrics
+            # Summary metrics (likes in both directions counted in one pass)
+            likes_by_direction = Counter(
+                direction
+                for direction, matches in (('outbound', outbound), ('inbound', inbound))
+                for m in matches if m.get('is_liked') == 'liked'
+            )
             col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.metric("Outbound Matches", len(outbound))
             with col2:
                 st.metric("Inbound Matches", len(inbound))
             with col3:
-                liked_out = sum(1 for m in outbound if m.get('is_liked') == 'liked')
-                st.metric("User's Likes", liked_out)
+                st.metric("User's Likes", likes_by_direction['outbound'])
             with col4:
-                liked_in = sum(1 for m in inbound if m.get('is_liked') == 'liked')
-                st.metric("Liked by Others", liked_in)
+                st.metric("Liked by Others", likes_by_direction['inbound'])
 
             st.divider()
 
@@ -1092,73 +1525,33 @@ with tab_user:
                 f"This user shown to ({len(inbound)})"
             ])
 
+            # Profiles for every partner in both lists, in one batch
+            partner_ids = user_ids_key(m['partner_user_id'] for m in outbound + inbound)
+            partner_summaries = summarize_profiles(fetch_user_profiles_batch(partner_ids))
+
             with user_tab1:
                 if outbound:
-                    # Get profiles for matched users
-                    matched_ids = tuple(sorted(set(m['matched_user_id'] for m in outbound)))
-                    profiles = fetch_user_profiles_batch(matched_ids)
-
-                    for match in outbound:
-                        matched_id = match['matched_user_id']
-                        profile = profiles.get(matched_id, {})
-                        name = profile.get('name', 'Unknown')
-                        photos = profile.get('profile_images') or profile.get('instagram_images') or []
-                        thumb = photos[0] if photos else None
-                        dob = profile.get('dob')
-                        age = calculate_age_from_dob(dob) if dob else profile.get('age')
-                        age_display = f", {age}" if age else ""
-
-                        with st.expander(f"{name}{age_display} ({matched_id[:8]}...) - {match.get('is_liked', 'N/A')}"):
-                            cols = st.columns([1, 3])
-                            with cols[0]:
-                                if thumb:
-                                    st.image(thumb, width=100)
-                                else:
-                                    st.markdown("No photo")
-                            with cols[1]:
-                                st.markdown(f"**Age:** {age if age else 'N/A'} | **Status:** {match.get('is_liked', 'N/A')} | **Viewed:** {match.get('is_viewed', False)}")
-                                st.markdown(f"**Mutual Score:** {match.get('mutual_score', 'N/A')} | **Rank:** {match.get('rank', 'N/A')}")
-                                st.markdown(f"**Phase:** {match.get('origin_phase', 'N/A')} | **Date:** {match.get('created_at', 'N/A')}")
-                                st.markdown(f"**Know More Count:** {match.get('know_more_count', 0)}")
+                    display_match_list(outbound, partner_summaries)
                 else:
                     st.info("No outbound matches found.")
 
             with user_tab2:
                 if inbound:
-                    # Get profiles for current users
-                    current_ids = tuple(sorted(set(m['current_user_id'] for m in inbound)))
-                    profiles = fetch_user_profiles_batch(current_ids)
-
-                    for match in inbound:
-                        current_id = match['current_user_id']
-                        profile = profiles.get(current_id, {})
-                        name = profile.get('name', 'Unknown')
-                        photos = profile.get('profile_images') or profile.get('instagram_images') or []
-                        thumb = photos[0] if photos else None
-                        dob = profile.get('dob')
-                        age = calculate_age_from_dob(dob) if dob else profile.get('age')
-                        age_display = f", {age}" if age else ""
-
-                        with st.expander(f"{name}{age_display} ({current_id[:8]}...) - {match.get('is_liked', 'N/A')}"):
-                            cols = st.columns([1, 3])
-                            with cols[0]:
-                                if thumb:
-                                    st.image(thumb, width=100)
-                                else:
-                                    st.markdown("No photo")
-                            with cols[1]:
-                                st.markdown(f"**Age:** {age if age else 'N/A'} | **Status:** {match.get('is_liked', 'N/A')} | **Viewed:** {match.get('is_viewed', False)}")
-                                st.markdown(f"**Mutual Score:** {match.get('mutual_score', 'N/A')} | **Rank:** {match.get('rank', 'N/A')}")
-                                st.markdown(f"**Phase:** {match.get('origin_phase', 'N/A')} | **Date:** {match.get('created_at', 'N/A')}")
-                                st.markdown(f"**Know More Count:** {match.get('know_more_count', 0)}")
+                    display_match_list(inbound, partner_summaries)
                 else:
                     st.info("No inbound matches found.")
     else:
         st.info("Enter a user ID above to view their match history.")
 
 
+with tab_user:
+    render_user_search_tab()
+
+
 # --- Tab 3: Mutual Likes ---
-with tab_mutual:
+@st.fragment
+def render_mutual_tab(overview_df, mutual_outcomes):
+    """Render the Mutual Likes tab: day-by-day mutual matches and near misses."""
     st.subheader("Mutual Likes List")
     st.markdown("""
     **Match Rules (evaluated per day):**
@@ -1169,188 +1562,22 @@ with tab_mutual:
     - Passed + Passed / Like + Dislike / Dislike + Like = No match
     """)
 
-    # Fetch data with filters
-    mutual_matches_data = fetch_overview_stats(
-        run_id=run_id_filter,
-        origin_phase=phase_filter,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    if not mutual_matches_data:
+    if overview_df.empty:
         st.info("No matches found for the selected filters.")
     else:
-        df_mutual = pd.DataFrame(mutual_matches_data)
-
-        # Parse dates and add date column
-        df_mutual['created_at'] = pd.to_datetime(df_mutual['created_at'])
-        df_mutual['action_date'] = df_mutual['created_at'].dt.date
-
-        # Treat NULL/None as 'passed'
-        df_mutual['is_liked'] = df_mutual['is_liked'].fillna('passed')
-
-        # Filter to only actions (liked, disliked, passed)
-        actions_df = df_mutual[df_mutual['is_liked'].isin(['liked', 'disliked', 'passed'])][
-            ['current_user_id', 'matched_user_id', 'is_liked', 'action_date', 'mutual_score', 'origin_phase', 'created_at']
-        ].copy()
-
-        if actions_df.empty:
+        if mutual_outcomes is None:
             st.info("No actions (likes/dislikes/passes) found in the selected date range.")
         else:
-            # Get unique dates sorted
-            unique_dates = sorted(actions_df['action_date'].unique())
-
-            # Build historical likes lookup: {(user_a, user_b): earliest_like_date}
-            # This tracks when user_a first liked user_b
-            likes_history = {}
-            likes_df = actions_df[actions_df['is_liked'] == 'liked']
-            for _, row in likes_df.iterrows():
-                key = (row['current_user_id'], row['matched_user_id'])
-                like_date = row['action_date']
-                if key not in likes_history or like_date < likes_history[key]:
-                    likes_history[key] = like_date
-
-            def find_matches_for_date(target_date, actions_df, likes_history, already_matched_pairs):
-                """Find all matches for a specific date using the new algorithm.
-                Returns (matches, missed_matches) tuple.
-
-                Rules:
-                1. Like + Like (same day) = Match
-                2. Like + Passed (same day) = Match if 'passed' user liked on a previous day
-                3. Passed + Like (same day) = Match if 'passed' user liked on a previous day
-                4. Like (today) + No action (today) = Match if other user liked on a previous day
-                5. Passed + Passed / Like + Dislike / Dislike + Like = No match
-                """
-                matches = []
-                missed_matches = []
-                seen_pairs = set()
-
-                # Get actions for this specific date
-                day_actions = actions_df[actions_df['action_date'] == target_date]
-
-                # Build lookup for this day: {(user_a, user_b): action}
-                day_action_lookup = {}
-                day_details_lookup = {}
-                for _, row in day_actions.iterrows():
-                    key = (row['current_user_id'], row['matched_user_id'])
-                    day_action_lookup[key] = row['is_liked']
-                    day_details_lookup[key] = {
-                        'mutual_score': row['mutual_score'],
-                        'origin_phase': row['origin_phase'],
-                        'created_at': row['created_at']
-                    }
-
-                # For each action on this day, check if there's a matching action
-                for (user1, user2), action1 in day_action_lookup.items():
-                    pair_key = tuple(sorted([user1, user2]))
-                    if pair_key in seen_pairs or pair_key in already_matched_pairs:
-                        continue
-
-                    # Get user2's action towards user1 on this day
-                    action2 = day_action_lookup.get((user2, user1))
-
-                    is_match = False
-                    is_missed = False
-                    match_type = ""
-                    missed_reason = ""
-
-                    if action2 is not None:
-                        # Both users took action on the same day
-                        if action1 == 'liked' and action2 == 'liked':
-                            is_match = True
-                            match_type = "Like + Like"
-                        elif action1 == 'liked' and action2 == 'passed':
-                            # Check if user2 liked user1 on a previous day
-                            prev_like_date = likes_history.get((user2, user1))
-                            if prev_like_date and prev_like_date < target_date:
-                                is_match = True
-                                match_type = "Like + Passed (prev like)"
-                            else:
-                                is_missed = True
-                                missed_reason = "Like + Passed (no prev like)"
-                        elif action1 == 'passed' and action2 == 'liked':
-                            # Check if user1 liked user2 on a previous day
-                            prev_like_date = likes_history.get((user1, user2))
-                            if prev_like_date and prev_like_date < target_date:
-                                is_match = True
-                                match_type = "Passed + Like (prev like)"
-                            else:
-                                is_missed = True
-                                missed_reason = "Passed + Like (no prev like)"
-                        elif action1 == 'passed' and action2 == 'passed':
-                            is_missed = True
-                            missed_reason = "Passed + Passed"
-                        elif action1 == 'liked' and action2 == 'disliked':
-                            is_missed = True
-                            missed_reason = "Like + Dislike"
-                        elif action1 == 'disliked' and action2 == 'liked':
-                            is_missed = True
-                            missed_reason = "Dislike + Like"
-                        elif action1 == 'disliked' and action2 == 'disliked':
-                            is_missed = True
-                            missed_reason = "Dislike + Dislike"
-                        elif action1 == 'disliked' and action2 == 'passed':
-                            is_missed = True
-                            missed_reason = "Dislike + Passed"
-                        elif action1 == 'passed' and action2 == 'disliked':
-                            is_missed = True
-                            missed_reason = "Passed + Dislike"
-                    else:
-                        # User2 did NOT take action on this day
-                        # Check if user1 liked today AND user2 liked on a previous day
-                        if action1 == 'liked':
-                            prev_like_date = likes_history.get((user2, user1))
-                            if prev_like_date and prev_like_date < target_date:
-                                is_match = True
-                                match_type = "Like + Previous Like"
-
-                    details = day_details_lookup.get((user1, user2), day_details_lookup.get((user2, user1), {}))
-
-                    if is_match:
-                        seen_pairs.add(pair_key)
-                        matches.append({
-                            'user_1': user1,
-                            'user_2': user2,
-                            'match_date': target_date,
-                            'match_type': match_type,
-                            'mutual_score': details.get('mutual_score'),
-                            'origin_phase': details.get('origin_phase'),
-                            'created_at': details.get('created_at')
-                        })
-                    elif is_missed:
-                        seen_pairs.add(pair_key)
-                        missed_matches.append({
-                            'user_1': user1,
-                            'user_2': user2,
-                            'match_date': target_date,
-                            'missed_reason': missed_reason,
-                            'action_1': action1,
-                            'action_2': action2,
-                            'mutual_score': details.get('mutual_score'),
-                            'origin_phase': details.get('origin_phase'),
-                            'created_at': details.get('created_at')
-                        })
-
-                return matches, missed_matches
-
-            # Find matches for all dates
+            daily_matches, daily_missed, action_history = mutual_outcomes
+            # Matches and missed matches for all dates, shared with the Per User tab
+            all_matches_combined = daily_matches.to_dict('records')
+            all_missed_combined = daily_missed.to_dict('records')
             all_matches_by_date = {}
-            all_matches_combined = []
+            for m in all_matches_combined:
+                all_matches_by_date.setdefault(m['match_date'], []).append(m)
             all_missed_by_date = {}
-            all_missed_combined = []
-            already_matched_pairs = set()  # Track pairs already matched to avoid duplicates
-
-            for d in unique_dates:
-                day_matches, day_missed = find_matches_for_date(d, actions_df, likes_history, already_matched_pairs)
-                if day_matches:
-                    all_matches_by_date[d] = day_matches
-                    all_matches_combined.extend(day_matches)
-                    # Add matched pairs to the set
-                    for m in day_matches:
-                        already_matched_pairs.add(tuple(sorted([m['user_1'], m['user_2']])))
-                if day_missed:
-                    all_missed_by_date[d] = day_missed
-                    all_missed_combined.extend(day_missed)
+            for m in all_missed_combined:
+                all_missed_by_date.setdefault(m['match_date'], []).append(m)
 
             # Date filter dropdown - include dates with matches OR missed matches
             dates_with_data = set(all_matches_by_date.keys()) | set(all_missed_by_date.keys())
@@ -1400,16 +1627,13 @@ with tab_mutual:
             # --- Unique Males/Females with Matches Section ---
             if display_matches:
                 # Collect all user IDs from matches
-                match_user_ids = list(set(
-                    [m['user_1'] for m in display_matches] +
-                    [m['user_2'] for m in display_matches]
-                ))
-                match_user_ids_tuple = tuple(sorted(match_user_ids))
+                match_user_ids_tuple = user_ids_key(u for m in display_matches for u in (m['user_1'], m['user_2']))
 
-                # Fetch genders for all matched users
-                with st.spinner("Loading gender data for matched users..."):
-                    matched_user_genders = fetch_user_genders(match_user_ids_tuple)
-                    matched_user_profiles = fetch_user_profiles_batch(match_user_ids_tuple)
+                # Fetch genders, profiles and contact info for all matched users
+                with st.spinner("Loading user data for matched users..."):
+                    matched_user_profiles, matched_user_genders, (_, matched_user_phones) = fetch_user_details(
+                        match_user_ids_tuple
+                    )
 
                 # Count matches per user
                 user_match_counts = {}
@@ -1417,10 +1641,6 @@ with tab_mutual:
                     user_match_counts[m['user_1']] = user_match_counts.get(m['user_1'], 0) + 1
                     user_match_counts[m['user_2']] = user_match_counts.get(m['user_2'], 0) + 1
 
-                # Fetch contact info for phone numbers
-                with st.spinner("Loading contact data..."):
-                    _, matched_user_phones = fetch_user_contact_batch(match_user_ids_tuple)
-
                 # Build a lookup for each user's matched partners
                 user_matched_partners = {}
                 for m in display_matches:
@@ -1435,7 +1655,7 @@ with tab_mutual:
                 # Split by gender
                 males_with_matches = []
                 females_with_matches = []
-                for uid in match_user_ids:
+                for uid in match_user_ids_tuple:
                     gender = matched_user_genders.get(uid)
                     profile = matched_user_profiles.get(uid, {})
                     phone = matched_user_phones.get(uid) or profile.get('phone_num') or 'N/A'
@@ -1547,20 +1767,6 @@ with tab_mutual:
 
                 st.divider()
 
-            # Build action history lookup for display: {(user_a, user_b): [(date, action), ...]}
-            action_history = {}
-            for _, row in actions_df.iterrows():
-                key = (row['current_user_id'], row['matched_user_id'])
-                if key not in action_history:
-                    action_history[key] = []
-                action_history[key].append({
-                    'date': row['action_date'],
-                    'action': row['is_liked']
-                })
-            # Sort each user's actions by date
-            for key in action_history:
-                action_history[key] = sorted(action_history[key], key=lambda x: x['date'])
-
             def format_action_history(user_from, user_to):
                 """Format action history for display."""
                 history = action_history.get((user_from, user_to), [])
@@ -1590,192 +1796,91 @@ with tab_mutual:
 
                 st.divider()
 
-                # Get all user IDs for profile fetching
-                all_mutual_user_ids = list(set(
-                    [p['user_1'] for p in display_matches] +
-                    [p['user_2'] for p in display_matches]
-                ))
-                all_mutual_user_ids_tuple = tuple(sorted(all_mutual_user_ids))
+                # Pairs are listed a page at a time; "Load more" extends the list for this date selection
+                pairs_shown_key = f"ms_mutual_pairs_shown_{selected_date_filter}"
+                pairs_shown = st.session_state.get(pairs_shown_key, MUTUAL_PAGE_SIZE)
+                visible_matches = display_matches[:pairs_shown]
+
+                # Get the listed pairs' user IDs for profile fetching
+                all_mutual_user_ids_tuple = user_ids_key(u for p in visible_matches for u in (p['user_1'], p['user_2']))
 
                 with st.spinner("Loading user profiles..."):
-                    mutual_profiles = fetch_user_profiles_batch(all_mutual_user_ids_tuple)
-                    mutual_genders = fetch_user_genders(all_mutual_user_ids_tuple)
-                    mutual_emails, mutual_phones = fetch_user_contact_batch(all_mutual_user_ids_tuple)
+                    mutual_profiles, mutual_genders, (mutual_emails, mutual_phones) = fetch_user_details(
+                        all_mutual_user_ids_tuple
+                    )
+
+                # One record per user with every field the pair cards show, defaults applied once
+                mutual_users = {}
+                for uid in all_mutual_user_ids_tuple:
+                    profile = mutual_profiles.get(uid, {})
+                    photos = profile.get('profile_images') or profile.get('instagram_images') or []
+                    mutual_users[uid] = {
+                        'name': profile.get('name', 'Unknown'),
+                        'gender': mutual_genders.get(uid, 'N/A'),
+                        'age': profile.get('age', 'N/A'),
+                        'city': profile.get('city', 'N/A'),
+                        'phone': mutual_phones.get(uid, 'N/A'),
+                        'email': mutual_emails.get(uid, 'N/A'),
+                        'photo': photos[0] if photos else None,
+                    }
 
-                # Display each mutual pair
-                for i, pair in enumerate(display_matches):
+                # Display each listed mutual pair
+                for i, pair in enumerate(visible_matches):
                     user1_id = pair['user_1']
                     user2_id = pair['user_2']
-                    user1_profile = mutual_profiles.get(user1_id, {})
-                    user2_profile = mutual_profiles.get(user2_id, {})
-
-                    user1_name = user1_profile.get('name', 'Unknown')
-                    user2_name = user2_profile.get('name', 'Unknown')
-                    user1_gender = mutual_genders.get(user1_id, 'N/A')
-                    user2_gender = mutual_genders.get(user2_id, 'N/A')
-                    user1_email = mutual_emails.get(user1_id, 'N/A')
-                    user2_email = mutual_emails.get(user2_id, 'N/A')
-                    user1_phone = mutual_phones.get(user1_id, 'N/A')
-                    user2_phone = mutual_phones.get(user2_id, 'N/A')
-
-                    user1_photos = user1_profile.get('profile_images') or user1_profile.get('instagram_images') or []
-                    user2_photos = user2_profile.get('profile_images') or user2_profile.get('instagram_images') or []
+                    user1 = mutual_users[user1_id]
+                    user2 = mutual_users[user2_id]
 
                     match_type_badge = f"[{pair['match_type']}]" if pair.get('match_type') else ""
-                    with st.expander(f"#{i+1}: {user1_name} ({user1_gender}) + {user2_name} ({user2_gender}) {match_type_badge}"):
-                        col1, col2 = st.columns(2)
-
-                        with col1:
-                            st.markdown(f"### {user1_name}")
-                            st.markdown(f"**User ID:** `{user1_id}`")
-                            st.markdown(f"**Gender:** {user1_gender}")
-                            st.markdown(f"**Age:** {user1_profile.get('age', 'N/A')}")
-                            st.markdown(f"**City:** {user1_profile.get('city', 'N/A')}")
-                            st.markdown(f"**Phone:** {user1_phone}")
-                            st.markdown(f"**Email:** {user1_email}")
-                            if user1_photos:
-                                st.image(user1_photos[0], width=200)
-                            # Show action history: user1's actions towards user2
-                            st.markdown("---")
-                            st.markdown(f"**Actions towards {user2_name}:**")
-                            st.markdown(format_action_history(user1_id, user2_id))
-
-                        with col2:
-                            st.markdown(f"### {user2_name}")
-                            st.markdown(f"**User ID:** `{user2_id}`")
-                            st.markdown(f"**Gender:** {user2_gender}")
-                            st.markdown(f"**Age:** {user2_profile.get('age', 'N/A')}")
-                            st.markdown(f"**City:** {user2_profile.get('city', 'N/A')}")
-                            st.markdown(f"**Phone:** {user2_phone}")
-                            st.markdown(f"**Email:** {user2_email}")
-                            if user2_photos:
-                                st.image(user2_photos[0], width=200)
-                            # Show action history: user2's actions towards user1
-                            st.markdown("---")
-                            st.markdown(f"**Actions towards {user1_name}:**")
-                            st.markdown(format_action_history(user2_id, user1_id))
+                    with st.expander(f"#{i+1}: {user1['name']} ({user1['gender']}) + {user2['name']} ({user2['gender']}) {match_type_badge}"):
+                        # Each column shows one user and their actions towards the other
+                        sides = ((user1_id, user1, user2_id, user2), (user2_id, user2, user1_id, user1))
+                        for col, (user_id, user, other_id, other) in zip(st.columns(2), sides):
+                            with col:
+                                st.markdown(f"### {user['name']}")
+                                st.markdown(f"**User ID:** `{user_id}`")
+                                st.markdown(f"**Gender:** {user['gender']}")
+                                st.markdown(f"**Age:** {user['age']}")
+                                st.markdown(f"**City:** {user['city']}")
+                                st.markdown(f"**Phone:** {user['phone']}")
+                                st.markdown(f"**Email:** {user['email']}")
+                                if user['photo']:
+                                    st.image(user['photo'], width=200)
+                                st.markdown("---")
+                                st.markdown(f"**Actions towards {other['name']}:**")
+                                st.markdown(format_action_history(user_id, other_id))
 
                         st.divider()
                         st.markdown(f"**Match Type:** {pair.get('match_type', 'N/A')} | **Match Date:** {pair['match_date']} | **Mutual Score:** {pair['mutual_score']} | **Phase:** {pair['origin_phase']}")
 
+                if pairs_shown < len(display_matches):
+                    st.caption(f"Showing {pairs_shown} of {len(display_matches)} pairs")
+                    st.button(
+                        "Load more", key="ms_mutual_load_more",
+                        on_click=show_more, args=(pairs_shown_key, pairs_shown + MUTUAL_PAGE_SIZE)
+                    )
+
+
+with tab_mutual:
+    render_mutual_tab(overview_df, mutual_outcomes)
+
 
 # --- Tab: Per User Matches ---
-with tab_per_user:
+@st.fragment
+def render_per_user_tab(overview_df, mutual_outcomes):
+    """Render the Per User Matches tab: each matched user with their matches."""
     st.subheader("Per User Matches")
     st.markdown("View each user with all their match details listed below them")
 
-    # Fetch data with filters
-    per_user_matches_data = fetch_overview_stats(
-        run_id=run_id_filter,
-        origin_phase=phase_filter,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    if not per_user_matches_data:
+    if overview_df.empty:
         st.info("No matches found for the selected filters.")
     else:
-        df_per_user = pd.DataFrame(per_user_matches_data)
-
-        # Parse dates and add date column
-        df_per_user['created_at'] = pd.to_datetime(df_per_user['created_at'])
-        df_per_user['action_date'] = df_per_user['created_at'].dt.date
-
-        # Treat NULL/None as 'passed'
-        df_per_user['is_liked'] = df_per_user['is_liked'].fillna('passed')
-
-        # Filter to only actions (liked, disliked, passed)
-        actions_per_user_df = df_per_user[df_per_user['is_liked'].isin(['liked', 'disliked', 'passed'])][
-            ['current_user_id', 'matched_user_id', 'is_liked', 'action_date', 'mutual_score', 'origin_phase', 'created_at']
-        ].copy()
-
-        if actions_per_user_df.empty:
+        if mutual_outcomes is None:
             st.info("No actions (likes/dislikes/passes) found in the selected date range.")
         else:
-            # Get unique dates sorted
-            unique_dates_pu = sorted(actions_per_user_df['action_date'].unique())
-
-            # Build historical likes lookup
-            likes_history_pu = {}
-            likes_df_pu = actions_per_user_df[actions_per_user_df['is_liked'] == 'liked']
-            for _, row in likes_df_pu.iterrows():
-                key = (row['current_user_id'], row['matched_user_id'])
-                like_date = row['action_date']
-                if key not in likes_history_pu or like_date < likes_history_pu[key]:
-                    likes_history_pu[key] = like_date
-
-            def find_matches_for_date_pu(target_date, actions_df, likes_history, already_matched_pairs):
-                """Find all matches for a specific date."""
-                matches = []
-                seen_pairs = set()
-
-                day_actions = actions_df[actions_df['action_date'] == target_date]
-                day_action_lookup = {}
-                day_details_lookup = {}
-                for _, row in day_actions.iterrows():
-                    key = (row['current_user_id'], row['matched_user_id'])
-                    day_action_lookup[key] = row['is_liked']
-                    day_details_lookup[key] = {
-                        'mutual_score': row['mutual_score'],
-                        'origin_phase': row['origin_phase'],
-                        'created_at': row['created_at']
-                    }
-
-                for (user1, user2), action1 in day_action_lookup.items():
-                    pair_key = tuple(sorted([user1, user2]))
-                    if pair_key in seen_pairs or pair_key in already_matched_pairs:
-                        continue
-
-                    action2 = day_action_lookup.get((user2, user1))
-                    is_match = False
-                    match_type = ""
-
-                    if action2 is not None:
-                        if action1 == 'liked' and action2 == 'liked':
-                            is_match = True
-                            match_type = "Like + Like"
-                        elif action1 == 'liked' and action2 == 'passed':
-                            prev_like_date = likes_history.get((user2, user1))
-                            if prev_like_date and prev_like_date < target_date:
-                                is_match = True
-                                match_type = "Like + Passed (prev like)"
-                        elif action1 == 'passed' and action2 == 'liked':
-                            prev_like_date = likes_history.get((user1, user2))
-                            if prev_like_date and prev_like_date < target_date:
-                                is_match = True
-                                match_type = "Passed + Like (prev like)"
-                    else:
-                        if action1 == 'liked':
-                            prev_like_date = likes_history.get((user2, user1))
-                            if prev_like_date and prev_like_date < target_date:
-                                is_match = True
-                                match_type = "Like + Previous Like"
-
-                    if is_match:
-                        seen_pairs.add(pair_key)
-                        details = day_details_lookup.get((user1, user2), day_details_lookup.get((user2, user1), {}))
-                        matches.append({
-                            'user_1': user1,
-                            'user_2': user2,
-                            'match_date': target_date,
-                            'match_type': match_type,
-                            'mutual_score': details.get('mutual_score'),
-                            'origin_phase': details.get('origin_phase'),
-                            'created_at': details.get('created_at')
-                        })
-
-                return matches
-
-            # Find all matches
-            all_matches_pu = []
-            already_matched_pairs_pu = set()
-
-            for d in unique_dates_pu:
-                day_matches = find_matches_for_date_pu(d, actions_per_user_df, likes_history_pu, already_matched_pairs_pu)
-                if day_matches:
-                    all_matches_pu.extend(day_matches)
-                    for m in day_matches:
-                        already_matched_pairs_pu.add(tuple(sorted([m['user_1'], m['user_2']])))
+            # Find all matches (same day-by-day rules as the Mutual Likes tab)
+            daily_matches = mutual_outcomes[0]
+            all_matches_pu = daily_matches.to_dict('records')
 
             if not all_matches_pu:
                 st.info("No mutual matches found.")
@@ -1791,18 +1896,12 @@ with tab_per_user:
                     selected_date_obj_pu = datetime.strptime(selected_date_pu, '%Y-%m-%d').date()
                     display_matches_pu = [m for m in all_matches_pu if m['match_date'] == selected_date_obj_pu]
 
-                # Collect all user IDs
-                all_user_ids_pu = list(set(
-                    [m['user_1'] for m in display_matches_pu] +
-                    [m['user_2'] for m in display_matches_pu]
-                ))
+                # Collect all user IDs (deduplicated and sorted)
+                all_user_ids_tuple_pu = user_ids_key(u for m in display_matches_pu for u in (m['user_1'], m['user_2']))
 
                 # Fetch profiles, genders, and contact info
                 with st.spinner("Loading user data..."):
-                    all_user_ids_tuple_pu = tuple(sorted(all_user_ids_pu))
-                    profiles_pu = fetch_user_profiles_batch(all_user_ids_tuple_pu)
-                    genders_pu = fetch_user_genders(all_user_ids_tuple_pu)
-                    emails_pu, phones_pu = fetch_user_contact_batch(all_user_ids_tuple_pu)
+                    profiles_pu, genders_pu, (emails_pu, phones_pu) = fetch_user_details(all_user_ids_tuple_pu)
 
                 # --- CSV Download Button for Unique Match Pairs ---
                 # Build unique pairs CSV data (independent of gender filter)
@@ -1873,7 +1972,7 @@ with tab_per_user:
 
                 # Build user data list
                 users_data_pu = []
-                for uid in all_user_ids_pu:
+                for uid in all_user_ids_tuple_pu:
                     profile = profiles_pu.get(uid, {})
                     users_data_pu.append({
                         'user_id': uid,
@@ -1951,170 +2050,71 @@ with tab_per_user:
                                 st.markdown(f"Score: {match['mutual_score']}")
 
 
-# --- Tab 4: Male Likes ---
-with tab_male_likes:
-    st.subheader("Males Who Received Likes")
-    st.markdown("List of males sorted by number of likes received")
-
-    # Fetch data with filters
-    male_likes_data_raw = fetch_overview_stats(
-        run_id=run_id_filter,
-        origin_phase=phase_filter,
-        start_date=start_date,
-        end_date=end_date
-    )
+with tab_per_user:
+    render_per_user_tab(overview_df, mutual_outcomes)
+
 
-    if not male_likes_data_raw:
+# --- Tabs 4 and 5: Male Likes / Female Likes ---
+@st.fragment
+def render_likes_tab(overview_df, likes_received, gender):
+    """Render a Likes tab: users of one gender ('male' or 'female') ranked by likes received."""
+    plural = f"{gender}s"
+    st.subheader(f"{plural.capitalize()} Who Received Likes")
+    st.markdown(f"List of {plural} sorted by number of likes received")
+
+    if overview_df.empty:
         st.info("No matches found for the selected filters.")
     else:
-        df_male_likes = pd.DataFrame(male_likes_data_raw)
-
-        # Get all likes where matched_user is male
+        # Likes received by users of this gender
         # matched_user_id is the person who RECEIVED the like
-        likes_received = df_male_likes[df_male_likes['is_liked'] == 'liked'][['matched_user_id']].copy()
+        if likes_received is not None:
+            likes_counts = likes_received[gender]
+            gender_user_ids = likes_counts.index.tolist()
 
-        if len(likes_received) > 0:
-            # Count likes per matched_user
-            likes_count = likes_received.groupby('matched_user_id').size().reset_index(name='likes_received')
-            likes_count = likes_count.sort_values('likes_received', ascending=False)
-
-            # Get all matched_user_ids
-            matched_user_ids = likes_count['matched_user_id'].tolist()
-
-            # Fetch gender for all matched users
-            with st.spinner("Loading user data..."):
-                matched_genders = fetch_user_genders(tuple(sorted(matched_user_ids)))
-
-            # Filter to only males
-            male_user_ids = [uid for uid in matched_user_ids if matched_genders.get(uid) == 'male']
+            if gender_user_ids:
+                st.metric(f"Total {plural.capitalize()} with Likes", len(gender_user_ids))
+                st.divider()
 
-            if male_user_ids:
-                # Fetch profiles and contact info for males
-                male_user_ids_tuple = tuple(sorted(male_user_ids))
-                male_profiles = fetch_user_profiles_batch(male_user_ids_tuple)
-                male_emails, male_phones = fetch_user_contact_batch(male_user_ids_tuple)
+                # Page through the top users; profiles and contacts are fetched for one page only
+                start, page_user_ids = select_likes_page(gender_user_ids[:LIKES_TOP_N], f'ms_{gender}_likes_page')
+                page_user_ids_tuple = user_ids_key(page_user_ids)
+                # Genders are already known from the tab's gender split
+                profiles, _, (emails, phones) = fetch_user_details(page_user_ids_tuple, with_genders=False)
 
                 # Build display data
-                male_likes_data = []
-                for uid in male_user_ids:
-                    like_count = likes_count[likes_count['matched_user_id'] == uid]['likes_received'].values[0]
-                    profile = male_profiles.get(uid, {})
-                    male_likes_data.append({
+                likes_data = []
+                for uid in page_user_ids:
+                    profile = profiles.get(uid, {})
+                    likes_data.append({
                         'user_id': uid,
                         'name': profile.get('name', 'Unknown'),
-                        'likes': like_count,
-                        'phone': male_phones.get(uid, 'N/A'),
-                        'email': male_emails.get(uid, 'N/A'),
+                        'likes': int(likes_counts[uid]),
+                        'phone': phones.get(uid, 'N/A'),
+                        'email': emails.get(uid, 'N/A'),
                         'photos': profile.get('profile_images') or profile.get('instagram_images') or []
                     })
 
-                st.metric("Total Males with Likes", len(male_likes_data))
-                st.divider()
-
-                # Display each male with likes
-                for i, male in enumerate(male_likes_data[:50]):  # Limit to top 50
-                    with st.expander(f"#{i+1}: {male['name']} - {male['likes']} likes"):
-                        col1, col2 = st.columns([1, 3])
-                        with col1:
-                            if male['photos']:
-                                st.image(male['photos'][0], width=150)
-                            else:
-                                st.markdown("No photo")
-                        with col2:
-                            st.markdown(f"**Name:** {male['name']}")
-                            st.markdown(f"**Likes Received:** {male['likes']}")
-                            st.markdown(f"**Phone:** {male['phone']}")
-                            st.markdown(f"**Email:** {male['email']}")
-                            st.markdown(f"**User ID:** `{male['user_id']}`")
+                # Display each user with likes
+                for i, entry in enumerate(likes_data, start=start):
+                    with st.expander(f"#{i+1}: {entry['name']} - {entry['likes']} likes"):
+                        display_likes_card(entry)
             else:
-                st.info("No males received likes in the selected date range.")
+                st.info(f"No {plural} received likes in the selected date range.")
         else:
             st.info("No likes found in the selected date range.")
 
 
-# --- Tab 5: Female Likes ---
-with tab_female_likes:
-    st.subheader("Females Who Received Likes")
-    st.markdown("List of females sorted by number of likes received")
-
-    # Fetch data with filters
-    female_likes_data_raw = fetch_overview_stats(
-        run_id=run_id_filter,
-        origin_phase=phase_filter,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    if not female_likes_data_raw:
-        st.info("No matches found for the selected filters.")
-    else:
-        df_female_likes = pd.DataFrame(female_likes_data_raw)
-
-        # Get all likes where matched_user is female
-        # matched_user_id is the person who RECEIVED the like
-        likes_received_f = df_female_likes[df_female_likes['is_liked'] == 'liked'][['matched_user_id']].copy()
-
-        if len(likes_received_f) > 0:
-            # Count likes per matched_user
-            likes_count_f = likes_received_f.groupby('matched_user_id').size().reset_index(name='likes_received')
-            likes_count_f = likes_count_f.sort_values('likes_received', ascending=False)
-
-            # Get all matched_user_ids
-            matched_user_ids_f = likes_count_f['matched_user_id'].tolist()
-
-            # Fetch gender for all matched users
-            with st.spinner("Loading user data..."):
-                matched_genders_f = fetch_user_genders(tuple(sorted(matched_user_ids_f)))
-
-            # Filter to only females
-            female_user_ids = [uid for uid in matched_user_ids_f if matched_genders_f.get(uid) == 'female']
-
-            if female_user_ids:
-                # Fetch profiles and contact info for females
-                female_user_ids_tuple = tuple(sorted(female_user_ids))
-                female_profiles = fetch_user_profiles_batch(female_user_ids_tuple)
-                female_emails, female_phones = fetch_user_contact_batch(female_user_ids_tuple)
-
-                # Build display data
-                female_likes_data = []
-                for uid in female_user_ids:
-                    like_count = likes_count_f[likes_count_f['matched_user_id'] == uid]['likes_received'].values[0]
-                    profile = female_profiles.get(uid, {})
-                    female_likes_data.append({
-                        'user_id': uid,
-                        'name': profile.get('name', 'Unknown'),
-                        'likes': like_count,
-                        'phone': female_phones.get(uid, 'N/A'),
-                        'email': female_emails.get(uid, 'N/A'),
-                        'photos': profile.get('profile_images') or profile.get('instagram_images') or []
-                    })
-
-                st.metric("Total Females with Likes", len(female_likes_data))
-                st.divider()
+with tab_male_likes:
+    render_likes_tab(overview_df, likes_received, 'male')
 
-                # Display each female with likes
-                for i, female in enumerate(female_likes_data[:50]):  # Limit to top 50
-                    with st.expander(f"#{i+1}: {female['name']} - {female['likes']} likes"):
-                        col1, col2 = st.columns([1, 3])
-                        with col1:
-                            if female['photos']:
-                                st.image(female['photos'][0], width=150)
-                            else:
-                                st.markdown("No photo")
-                        with col2:
-                            st.markdown(f"**Name:** {female['name']}")
-                            st.markdown(f"**Likes Received:** {female['likes']}")
-                            st.markdown(f"**Phone:** {female['phone']}")
-                            st.markdown(f"**Email:** {female['email']}")
-                            st.markdown(f"**User ID:** `{female['user_id']}`")
-            else:
-                st.info("No females received likes in the selected date range.")
-        else:
-            st.info("No likes found in the selected date range.")
+with tab_female_likes:
+    render_likes_tab(overview_df, likes_received, 'female')
 
 
 # --- Tab 6: Trends ---
-with tab_trends:
+@st.fragment
+def render_trends_tab():
+    """Render the Trends tab: daily matches, likes and views."""
     st.subheader("Match Trends Over Time")
 
     # Time range selector
@@ -2122,40 +2122,21 @@ with tab_trends:
     selected_days = st.selectbox("Time Range", options=list(days_options.keys()), index=2)
     days = days_options[selected_days]
 
-    # Fetch time series data
+    # Fetch time series data, aggregated per day
     with st.spinner("Loading trends..."):
-        daily_data = fetch_daily_stats(days=days, run_id=run_id_filter, origin_phase=phase_filter)
+        daily_engagement = fetch_daily_trends(days=days, run_id=run_id_filter, origin_phase=phase_filter)
 
-    if not daily_data:
+    if daily_engagement is None:
         st.info("No data available for the selected time range.")
     else:
-        df = pd.DataFrame(daily_data)
-        df['date'] = pd.to_datetime(df['created_at']).dt.date
-
-        # Daily matches count
-        daily_counts = df.groupby('date').size().reset_index(name='matches')
-        daily_counts = daily_counts.sort_values('date')
-
         st.subheader("Matches per Day")
-        st.line_chart(daily_counts.set_index('date')['matches'])
+        st.line_chart(daily_engagement.set_index('date')['matches'])
 
         st.divider()
 
         # Engagement by day
         st.subheader("Engagement by Day")
 
-        daily_engagement = df.groupby('date').agg({
-            'is_liked': lambda x: (x == 'liked').sum(),
-            'is_viewed': lambda x: x.sum() if x.dtype == bool else (x == True).sum()
-        }).reset_index()
-        daily_engagement.columns = ['date', 'likes', 'views']
-        daily_engagement = daily_engagement.sort_values('date')
-
-        # Merge with daily counts
-        daily_engagement = daily_engagement.merge(daily_counts, on='date')
-        daily_engagement['like_rate'] = (daily_engagement['likes'] / daily_engagement['matches'] * 100).round(1)
-        daily_engagement['view_rate'] = (daily_engagement['views'] / daily_engagement['matches'] * 100).round(1)
-
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("**Likes per Day**")
@@ -2175,3 +2156,7 @@ with tab_trends:
             use_container_width=True,
             hide_index=True
         )
+
+
+with tab_trends:
+    render_trends_tab()
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+PostgREST CSV parsing - read CSV responses into DataFrames without losing NULL vs ''.
+"""
+import io
+import re
+
+import pandas as pd
+
+# One CSV field (quoted, with "" escapes, or bare) and the delimiter that ends it
+CSV_FIELD = re.compile(r'("(?:[^"]|"")*"|[^,"\n]*)(,|\n|$)')
+# Stands in for a quoted empty field while pandas parses the page
+EMPTY_STRING_MARK = '\x1f'
+
+
+def mark_empty_strings(text: str) -> str:
+    """Replace every quoted empty field ("") in a CSV body with EMPTY_STRING_MARK.
+
+    Fields are walked in order, so a "" inside a longer quoted value (an
+    escaped quote) is left alone.
+    """
+    if '""' not in text:
+        return text
+    return CSV_FIELD.sub(
+        lambda m: EMPTY_STRING_MARK + m.group(2) if m.group(1) == '""' else m.group(0),
+        text
+    )
+
+
+def read_postgrest_csv(text: str, dtypes: dict) -> pd.DataFrame:
+    """
+    Parse a PostgREST CSV response into a DataFrame with fixed column dtypes.
+
+    PostgREST writes NULL as an unquoted empty field and '' as "", and
+    booleans as t/f. pd.read_csv cannot tell the two empties apart, so quoted
+    empties are marked before parsing and restored to '' afterwards in the
+    'str' columns of dtypes; everywhere else an empty field is NULL. Strings
+    such as 'NA' or 'null' are kept as they are.
+    """
+    df = pd.read_csv(
+        io.StringIO(mark_empty_strings(text)), true_values=['t'], false_values=['f'],
+        keep_default_na=False, na_values=[''], dtype=dtypes
+    )
+    for col in df.columns.intersection([c for c, dtype in dtypes.items() if dtype == 'str']):
+        empty = df[col].eq(EMPTY_STRING_MARK)
+        if empty.any():
+            df[col] = df[col].mask(empty, '')
+    return df
@@ -0,0 +1,44 @@
+"""
+Tests for services.postgrest_csv.
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.postgrest_csv import EMPTY_STRING_MARK, mark_empty_strings, read_postgrest_csv
+
+DTYPES = {'id': 'str', 'label': 'str', 'flag': 'boolean', 'score': 'float64'}
+
+
+def test_quoted_empty_is_empty_string_and_bare_empty_is_null():
+    df = read_postgrest_csv('id,label,flag,score\na,"",t,1.5\nb,,,\n', DTYPES)
+    assert df.loc[0, 'label'] == ''
+    assert pd.isna(df.loc[1, 'label'])
+    assert pd.isna(df.loc[1, 'flag'])
+    assert pd.isna(df.loc[1, 'score'])
+
+
+def test_embedded_commas_and_quotes_are_kept():
+    text = 'id,label,flag,score\na,"x,"",y",f,\nb,"say ""hi""",t,2\nc,""",""",t,\n'
+    df = read_postgrest_csv(text, DTYPES)
+    assert df['label'].tolist() == ['x,",y', 'say "hi"', '","']
+
+
+def test_na_like_strings_are_not_null():
+    df = read_postgrest_csv('id,label,flag,score\nNA,null,t,1\n', DTYPES)
+    assert df.loc[0, 'id'] == 'NA'
+    assert df.loc[0, 'label'] == 'null'
+
+
+def test_dtypes_are_fixed_when_a_page_is_all_null():
+    df = read_postgrest_csv('id,label,flag,score\na,,,\nb,,,\n', DTYPES)
+    assert df['flag'].dtype == 'boolean'
+    assert df['score'].dtype == 'float64'
+    assert df['flag'].tolist() == [pd.NA, pd.NA]
+
+
+def test_mark_only_touches_whole_quoted_empty_fields():
+    assert mark_empty_strings('"",a,"b"""\n,""\n') == f'{EMPTY_STRING_MARK},a,"b"""\n,{EMPTY_STRING_MARK}\n'